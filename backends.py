@@ -0,0 +1,108 @@
+""" This module contains the registry of estimator backends which can be evaluated by the random forest class."""
+
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from sklearn.ensemble import RandomForestRegressor, ExtraTreesRegressor
+from sklearn.linear_model import LinearRegression
+
+try:
+    # histogram based boosting is still experimental in the pinned scikit-learn release
+    from sklearn.experimental import enable_hist_gradient_boosting  # noqa: F401
+except ImportError:
+    pass
+from sklearn.ensemble import HistGradientBoostingRegressor
+
+
+class EstimatorBackend(ABC):
+    """ Backend interface for building the estimator fitted on every fold of a cross validation."""
+
+    name = ""
+    # whether the estimator fits a response of several columns at once
+    multiOutput = True
+
+    @abstractmethod
+    def build(self, **params):
+        pass
+
+
+class RandomForestBackend(EstimatorBackend):
+    """ Bootstrap aggregated forest of fully grown regression trees, the original model of the program."""
+
+    name = "randomforest"
+    _estimator = RandomForestRegressor
+
+    def build(self, **params):
+        """ Returns an unfitted forest, hyperparameters are passed through unchanged."""
+
+        return self._estimator(**params)
+
+
+class ExtraTreesBackend(RandomForestBackend):
+    """ Extremely randomised trees which draw split thresholds at random instead of searching for them."""
+
+    name = "extratrees"
+    _estimator = ExtraTreesRegressor
+
+    def build(self, **params):
+        """ Returns an unfitted forest, sampling rows requires bootstrapping to be switched on."""
+
+        if params.get("max_samples") is not None or params.get("oob_score"):
+            params.setdefault("bootstrap", True)
+
+        return self._estimator(**params)
+
+
+class HistGradientBoostingBackend(EstimatorBackend):
+    """ Histogram based gradient boosting, usually an order of magnitude faster than forests on long histories."""
+
+    name = "histgradientboosting"
+    multiOutput = False
+    # forest hyperparameters which have an equivalent on the boosting model
+    _translation = {"n_estimators": "max_iter",
+                    "max_depth": "max_depth",
+                    "min_samples_leaf": "min_samples_leaf",
+                    "random_state": "random_state"}
+
+    def build(self, **params):
+        """ Returns an unfitted boosting model, forest only hyperparameters are dropped."""
+
+        translated = {self._translation[name]: value for name, value in params.items()
+                      if name in self._translation and value is not None}
+
+        return HistGradientBoostingRegressor(**translated)
+
+
+class LinearBackend(EstimatorBackend):
+    """ Ordinary least squares baseline which every tree model should beat."""
+
+    name = "linear"
+
+    def build(self, **params):
+        """ Returns an unfitted linear regression, tree hyperparameters do not apply."""
+
+        return LinearRegression(n_jobs=params.get("n_jobs"))
+
+
+estimatorBackends = {}
+
+
+def registerBackend(backend) -> EstimatorBackend:
+    """ Adds the backend to the registry under its name and returns it."""
+
+    estimatorBackends[backend.name] = backend
+
+    return backend
+
+
+def createBackend(name) -> EstimatorBackend:
+    """ Returns the registered backend with the given name."""
+
+    try:
+        return estimatorBackends[name]
+    except KeyError:
+        raise ValueError("Unknown estimator backend '{}', choose one of: {}.".format(
+            name, ", ".join(sorted(estimatorBackends)))) from None
+
+
+for _backend in (RandomForestBackend(), ExtraTreesBackend(), HistGradientBoostingBackend(), LinearBackend()):
+    registerBackend(_backend)
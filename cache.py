@@ -0,0 +1,213 @@
+"""This module is responsible for memoising the results of expensive model evaluations, in memory and on disk."""
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import hashlib
+import os
+import pickle
+import tempfile
+import numpy as np
+# ----------------------------------------------------------------------------
+
+# sentinel which distinguishes a missing entry from a cached None
+_missing = object()
+
+
+def hashDataset(*arrays) -> str:
+    """ Returns a digest identifying the contents, shape and type of the arrays passed in."""
+
+    digest = hashlib.sha1()
+
+    for array in arrays:
+        values = np.ascontiguousarray(array)
+        digest.update(str(values.dtype).encode())
+        digest.update(str(values.shape).encode())
+        digest.update(values.tobytes())
+
+    return digest.hexdigest()
+
+
+def hashKey(*parts) -> str:
+    """ Returns a digest of a cache key built from plain python values (strings, numbers, tuples and dictionaries)."""
+
+    normalised = []
+
+    for part in parts:
+        if isinstance(part, dict):
+            # dictionary ordering must not change the key
+            part = sorted(part.items())
+        normalised.append(part)
+
+    return hashlib.sha1(repr(normalised).encode()).hexdigest()
+
+
+def writeAtomically(path, value):
+    """ Pickles the value to the file, replacing any previous content.
+    The value is written to a temporary file first so readers never see a partial file, even after an interruption."""
+
+    handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    with os.fdopen(handle, "wb") as entry:
+        pickle.dump(value, entry, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary, path)
+
+
+class Cache(ABC):
+    """ Cache interface for storing the results of evaluations by key."""
+
+    @abstractmethod
+    def get(self, key, default=None):
+        pass
+
+    @abstractmethod
+    def put(self, key, value) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+    def __contains__(self, key):
+        return self.get(key, _missing) is not _missing
+
+    def snapshot(self) -> list:
+        """ Returns the (key, value) pairs held only by this process, persistent stores return none."""
+
+        return []
+
+    def restore(self, entries):
+        """ Adds the (key, value) pairs of a snapshot to the cache."""
+
+        for key, value in entries:
+            self.put(key, value)
+
+
+class DirectoryStore(Cache):
+    """ Persistent cache which stores one pickle file per key inside a directory.
+    Files are written atomically so several processes may share the same store.
+    When maxEntries is given, the least recently used files are removed once the store holds more entries."""
+
+    def __init__(self, path, maxEntries=None):
+        self._path = path
+        self._maxEntries = maxEntries
+        os.makedirs(self._path, exist_ok=True)
+
+    def _fileName(self, key):
+        return os.path.join(self._path, hashKey(key) + ".pkl")
+
+    def get(self, key, default=None):
+        """ Returns the stored value of the key, or the default when it has never been stored."""
+
+        fileName = self._fileName(key)
+        try:
+            with open(fileName, "rb") as entry:
+                value = pickle.load(entry)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return default
+
+        if self._maxEntries is not None:
+            # the modification time orders the entries from least to most recently used
+            try:
+                os.utime(fileName)
+            except OSError:
+                pass
+
+        return value
+
+    def put(self, key, value):
+        """ Stores the value of the key, replacing any previous value."""
+
+        writeAtomically(self._fileName(key), value)
+
+        if self._maxEntries is not None:
+            self._evict()
+
+    def _evict(self):
+        """ Removes the least recently used entries above the maximum size of the store."""
+
+        entries = []
+        for fileName in os.listdir(self._path):
+            if fileName.endswith(".pkl"):
+                path = os.path.join(self._path, fileName)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    # removed by another process in the meantime
+                    continue
+
+        for _, path in sorted(entries)[:max(0, len(entries) - self._maxEntries)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        """ Removes every entry from the store."""
+
+        for fileName in os.listdir(self._path):
+            if fileName.endswith(".pkl"):
+                os.remove(os.path.join(self._path, fileName))
+
+
+class LRUCache(Cache):
+    """ In-process least recently used cache, optionally backed by a persistent store.
+    Entries evicted from memory remain available from the backing store."""
+
+    def __init__(self, maxSize=128, backingStore=None):
+        self._maxSize = maxSize
+        self._backingStore = backingStore
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """ Returns the cached value of the key, falling back to the backing store on a miss in memory."""
+
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        if self._backingStore is not None:
+            value = self._backingStore.get(key, _missing)
+            if value is not _missing:
+                self._remember(key, value)
+                self.hits += 1
+                return value
+
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        """ Caches the value of the key in memory and in the backing store."""
+
+        self._remember(key, value)
+
+        if self._backingStore is not None:
+            self._backingStore.put(key, value)
+
+    def clear(self):
+        """ Empties the in-process cache; the backing store is left untouched."""
+
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def snapshot(self):
+        """ Returns the (key, value) pairs held in memory, from least to most recently used."""
+
+        return list(self._entries.items())
+
+    def _remember(self, key, value):
+
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+
+        # evict the least recently used entry
+        while len(self._entries) > self._maxSize:
+            self._entries.popitem(last=False)
+
+    def __contains__(self, key):
+        # membership tests must not disturb the hit and miss counters
+        if key in self._entries:
+            return True
+        return self._backingStore is not None and key in self._backingStore
@@ -2,11 +2,20 @@
 
 from __future__ import annotations
 from abc import ABC, abstractmethod
+from functools import partial
+import warnings
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
 from numpy import mean
+from sklearn.base import clone
 from sklearn.model_selection import TimeSeriesSplit, KFold
 from sklearn.metrics import mean_absolute_error, mean_squared_error
+from cache import LRUCache, hashDataset
+from ranking import FeatureRanker
+from executor import FoldExecutor, trainingResponse, orderedPredict
+from backends import createBackend
+from racing import RacingEvaluator
+from memory import modelFootprint
+from metrics import OutOfFoldPredictions
 
 
 class Classifier(ABC):
@@ -33,27 +42,201 @@ class Classifier(ABC):
         pass
 
     @abstractmethod
-    def calculateFitnessPSO(self, featureMax, exploratoryTraining, responseTraining) -> float:
+    def configuration(self) -> tuple:
         pass
 
+    @abstractmethod
+    def calculateFitnessPSO(self, featureMax, exploratoryTraining, responseTraining, incumbent=None, fidelity=None) -> float:
+        pass
+
+    @abstractmethod
+    def cachedFitness(self, featureMax, exploratoryTraining, responseTraining, fidelity=None) -> float:
+        pass
+
+    @abstractmethod
+    def recordFitness(self, featureMax, exploratoryTraining, responseTraining, fitness, fidelity=None) -> None:
+        pass
+
+    @abstractmethod
+    def fitnessEntries(self) -> list:
+        pass
+
+    @abstractmethod
+    def restoreFitness(self, entries) -> None:
+        pass
+
+    @abstractmethod
+    def setCoreBudget(self, coreBudget) -> None:
+        pass
+
+    @abstractmethod
+    def calculateMultiHorizon(self, exploratoryTesting, responseTesting, confirm, horizons=(1, 5, 21)) -> np.ndarray:
+        pass
+
+    @abstractmethod
+    def calculateLearningCurve(self, exploratoryTesting, responseTesting, confirm, stages=(25, 50, 100, 200), featureMax=None) -> dict:
+        pass
+
+    @abstractmethod
+    def fitFinalModel(self, featureMax, exploratoryTesting, responseTesting) -> tuple:
+        pass
+
+
+def splitHyperparameters(featureMax) -> tuple:
+    """ Returns the amount of features and the other hyperparameters of an optimiser result, which is either
+    an amount of features or a dictionary of hyperparameters including max_features."""
+
+    if isinstance(featureMax, dict):
+        params = dict(featureMax)
+        return int(params.pop("max_features")), params
+
+    return int(featureMax), {}
+
+
+def _growFold(model, exploratory, response, trainINDEX, testINDEX, stages, sizeParam):
+    """ Grows one ensemble through every stage on the training rows of a fold, adding only the new members at each stage.
+    Returns the mean absolute error and root mean squared error of the test rows at every stage."""
+
+    xTrain, xTest = exploratory[trainINDEX, :], exploratory[testINDEX, :]
+    yTrain = trainingResponse(response, trainINDEX)
+    yTest = np.ravel(response[testINDEX])
+
+    scores = []
+    for stage in stages:
+        # warm start keeps the fitted members and only fits the new ones
+        model.set_params(**{sizeParam: stage})
+        model.fit(xTrain, yTrain)
+        residuals = orderedPredict(model, xTest) - yTest
+        scores.append((np.mean(np.abs(residuals)),
+                      np.sqrt(np.mean(residuals ** 2))))
+
+    return scores
+
+
+class Fidelity:
+
+    """ Fidelity of a fitness evaluation: the number of trees, the share of the most recent rows used and the number of folds.
+    Low fidelities are cheap approximations used to screen candidates, full fidelity matches the final evaluation."""
+
+    def __init__(self, nEstimators=100, rowFraction=1.0, nSplits=10):
+        self.nEstimators = int(nEstimators)
+        self.rowFraction = float(rowFraction)
+        self.nSplits = int(nSplits)
+
+    @classmethod
+    def level(cls, rung, eta=3):
+        """ Returns the fidelity of a successive halving rung, rung 0 being full fidelity.
+        Every rung divides the trees by eta, the rows by the square root of eta and the folds by eta."""
+
+        return cls(nEstimators=max(10, round(100 / eta ** rung)),
+                   rowFraction=max(0.25, 1 / eta ** (rung / 2)),
+                   nSplits=max(3, round(10 / eta ** rung)))
+
+    def key(self) -> tuple:
+        return (self.nEstimators, self.rowFraction, self.nSplits)
+
+    def __repr__(self):
+        return "Fidelity(nEstimators={}, rowFraction={}, nSplits={})".format(*self.key())
+
+    def subsample(self, exploratory, response):
+        """ Returns the most recent share of the rows, keeping their time order."""
+
+        start = len(response) - max(int(round(len(response) * self.rowFraction)), self.nSplits + 1)
+
+        return exploratory[max(start, 0):], response[max(start, 0):]
+
 
 class RandomForest(Classifier):
 
     """ Random forest class which contains methods for calculating model accuracies. """
 
-    def __init__(self, targetVARS, scaler, exploratoryTraining, exploratoryTest):
+    _fitnessModes = ("cv", "oob", "holdout")
+
+    def __init__(self, targetVARS, scaler, exploratoryTraining, exploratoryTest, fitnessCache=None, ranker=None, executor=None, backend="randomforest", fitnessMode="cv", racing=None, memoryBudget=None):
         self._targetVars = targetVARS
+        # estimator fitted on every fold, a random forest unless another backend is selected
+        self._backend = createBackend(backend)
+        if fitnessMode not in self._fitnessModes:
+            raise ValueError("Unknown fitness mode '{}'.".format(fitnessMode))
+        # how a particle is scored: full cross validation, out-of-bag error or a held-out tail block
+        self._fitnessMode = fitnessMode
         self._scaler = scaler
         self._exploratoryTrain = exploratoryTraining
         self._exploratoryTest = exploratoryTest
+        # memoised particle fitness, optionally backed by a persistent store
+        self._fitnessCache = fitnessCache if fitnessCache is not None else LRUCache()
+        # folds run in parallel within one global core budget
+        self._executor = executor if executor is not None else FoldExecutor()
+        # feature importance ordering, computed once per dataset
+        self._ranker = ranker if ranker is not None else FeatureRanker(
+            nJobs=self._executor.coreBudget)
+        # cross validation of poor candidates is abandoned early when racing is switched on
+        self._racing = RacingEvaluator(
+            self._executor, racing) if racing is not None else None
+        # caps on the growth of every tree, None grows trees fully
+        self._memoryBudget = memoryBudget
+        # out-of-fold predictions of the latest evaluation, further metrics are computed from them without refitting
+        self.outOfFold = None
+        # standardised portfolios, column selection happens on these
+        self._scaledTrain = None
+        self._scaledTest = None
+
+    def _modelConfig(self) -> dict:
+        """ Returns the hyperparameters shared by every random forest fitted during the fitness evaluation."""
+
+        return {"backend": self._backend.name, "random_state": 0, "ranking": repr(self._ranker), "fitness": self._fitnessMode,
+                "memory": self._memoryBudget.key() if self._memoryBudget is not None else None}
+
+    def configuration(self) -> tuple:
+        """ Returns the settings of the classifier which change the fitness of a particle, as a hashable key."""
+
+        return tuple(sorted(self._modelConfig().items()))
+
+    def _effectiveParams(self, params) -> dict:
+        """ Returns the hyperparameters an estimator is built with, the searched values capped by the memory budget."""
+
+        if self._memoryBudget is None:
+            return dict(params)
+
+        return self._memoryBudget.cap(params)
+
+    def _searchedParams(self, params) -> dict:
+        """ Returns the effective values of the searched hyperparameters alone."""
+
+        effective = self._effectiveParams(params)
+
+        return {name: effective[name] for name in params}
+
+    def _buildModel(self, **params):
+        """ Returns an unfitted estimator of the backend, with the tree growth caps of the memory budget applied."""
+
+        return self._backend.build(**self._effectiveParams(params))
+
+    def _crossValidate(self, model, exploratory, response, fitnessFunct, record=False):
+        """ Fits the model on every fold of the splitter through the fold executor.
+        Returns the actual and predicted values of each test fold in fold order.
+        When record is set, the out-of-fold predictions of the run are kept in outOfFold."""
+
+        splits = list(fitnessFunct.split(exploratory, response))
+        # the splitter's representation names the scheme and its parameters
+        folds = self._executor.runFolds(
+            model, exploratory, response, splits, scheme=repr(fitnessFunct))
+
+        if record:
+            self.outOfFold = OutOfFoldPredictions.fromFolds(folds, response)
+
+        return [(response[fold["testIndex"]], fold["predictions"]) for fold in folds]
 
     # proposed model RF-PSO
     def calculateModelAccuracy(self, featureMax, exploratoryTesting, responseTesting):
-        """ Returns the mean absolute error and root mean squared error of the proposed rf-pso machine learning model."""
+        """ Returns the mean absolute error and root mean squared error of the proposed rf-pso machine learning model.
+        The amount of features may be a dictionary of every hyperparameter found by the optimiser."""
+
+        featureMax, params = splitHyperparameters(featureMax)
 
         # Fit a fandom forest model to find the optimal features on the RF from hyperparameters of PSO gbest
-        model = RandomForestRegressor(
-            n_estimators=100, random_state=0, max_features=featureMax)
+        model = self._buildModel(
+            n_estimators=params.pop("n_estimators", 100), random_state=0, max_features=featureMax, **params)
 
         # 10-fold cross validation
         fitnessFunct = TimeSeriesSplit(n_splits=10)
@@ -67,18 +250,9 @@ class RandomForest(Classifier):
 
         exploratoryTestingFI = self.featureImpSplitTest(featureMax, orderedI)
 
-        for trainINDEX, testINDEX in fitnessFunct.split(exploratoryTestingFI, responseTesting):
-
-            # Split the data
-            xTrain, xTest = exploratoryTestingFI[trainINDEX,
-                                                 :], exploratoryTestingFI[testINDEX, :]
-            yTrain, yTest = responseTesting[trainINDEX], responseTesting[testINDEX]
+        for yTest, predValues in self._crossValidate(model, exploratoryTestingFI, responseTesting, fitnessFunct, record=True):
 
             yTestNP = np.ravel(yTest)
-            yTrainNP = np.ravel(yTrain)
-
-            model.fit(xTrain, yTrainNP)
-            predValues = model.predict(xTest)
 
             # Evaluate the validation with specified model
             acc = mean_absolute_error(predValues, yTestNP)
@@ -99,7 +273,7 @@ class RandomForest(Classifier):
         """ Returns the mean absolute error and root means squared error of the baseline model - random forest classifier. """
 
         # Fit a fandom forest model to find the optimal features on the RF from hyperparameters of PSO gbest
-        model = RandomForestRegressor(
+        model = self._buildModel(
             n_estimators=100, random_state=0)
 
         if confirm == 3:
@@ -116,18 +290,9 @@ class RandomForest(Classifier):
         outerResults = []
         outerResults2 = []
 
-        for trainINDEX, testINDEX in fitnessFunct.split(exploratoryTesting, responseTesting):
-
-            # Split the data
-            xTrain, xTest = exploratoryTesting[trainINDEX,
-                                               :], exploratoryTesting[testINDEX, :]
-            yTrain, yTest = responseTesting[trainINDEX], responseTesting[testINDEX]
+        for yTest, predValues in self._crossValidate(model, exploratoryTesting, responseTesting, fitnessFunct, record=True):
 
             yTestNP = np.ravel(yTest)
-            yTrainNP = np.ravel(yTrain)
-
-            model.fit(xTrain, yTrainNP)
-            predValues = model.predict(xTest)
 
             # Evaluate the validation with specified model
             acc = mean_absolute_error(predValues, yTestNP)
@@ -144,113 +309,150 @@ class RandomForest(Classifier):
         return averageAccMAE, averageAccRMSE
 
     def featureImp(self, exploratoryTraining, responseTraining, featureMax):
-        """ This method retrievesthe feature importance scores during the training process and returns
-        a sorted list by the index in order of increasing importance."""
+        """ This method retrieves the feature importance ordering of the dataset from the ranking service and returns
+        a sorted list by the index in order of increasing importance. The ordering is computed once per dataset."""
 
-        # setting the number of features to the solution
-        model = RandomForestRegressor(
-            n_estimators=100, random_state=0, max_features=featureMax, criterion="mae")
+        return self._ranker.rankFeatures(exploratoryTraining, responseTraining)
 
-        # 10-fold cross validation
-        fitnessFunc = TimeSeriesSplit(n_splits=10)
+    def _selectColumns(self, featureMax, orderedIndex):
+        """ Returns the indices of the featureMax most important columns in their original order."""
 
-        for trainINDEX, testINDEX in fitnessFunc.split(exploratoryTraining, responseTraining):
+        featureMax = min(max(int(featureMax), 1), len(orderedIndex))
+        # the least important features are at the front of the ordered index
+        return np.sort(np.asarray(orderedIndex)[len(orderedIndex) - featureMax:])
 
-            # Split the data
-            xTrain, _ = exploratoryTraining[trainINDEX,
-                                            :], exploratoryTraining[testINDEX, :]
-            yTrain, _ = responseTraining[trainINDEX], responseTraining[testINDEX]
+    def featureImpSplitTrain(self, featureMax, orderedIndex):
+        """ Prepares portfolio holder into the splits required for training and testing of machine learning models."""
 
-            yTrainNP = np.ravel(yTrain)
+        if self._scaledTrain is None:
+            # Standardise and transform data once, every column is scaled independently
+            self._scaledTrain = self._scaler.fit_transform(
+                self._exploratoryTrain)
 
-            # fit the model using training data
-            model.fit(xTrain, yTrainNP)
+        # keep only the most important features
+        return self._scaledTrain[:, self._selectColumns(featureMax, orderedIndex)]
 
-            featureImpDict = {}   # dictionary to store index of the important features
-            # feature importance, which features are most strongly related
-            for idx, value in enumerate(model.feature_importances_):
-                featureImpDict[idx] = value
+    def featureImpSplitTest(self, featureMax, orderedIndex):
+        """ Prepares portfolio holder into the splits required for training and testing of machine learning models."""
 
-            # sorting the index by increasign importances values
-            featureImpList = sorted(featureImpDict, key=featureImpDict.get)
+        if self._scaledTest is None:
+            # Standardise and transform data once, every column is scaled independently
+            self._scaledTest = self._scaler.fit_transform(
+                self._exploratoryTest)
 
-        return featureImpList
+        # keep only the most important features
+        return self._scaledTest[:, self._selectColumns(featureMax, orderedIndex)]
 
-    def featureImpSplitTrain(self, featureMax, orderedIndex):
-        """ Prepares portfolio holder into the splits required for training and testing of machine learning models."""
+    def _fitnessKey(self, featureMax, exploratoryTraining, responseTraining, fidelity):
 
-        variables = self._targetVars
+        featureMax, params = splitHyperparameters(featureMax)
+        key = (hashDataset(exploratoryTraining, responseTraining),
+               featureMax, self.configuration(), fidelity.key())
 
-        j = 0
-        # for as long as max features in n_features.
-        for _ in range(0, (12-featureMax)):
-            number = orderedIndex[j]  # pop the least important feature
-            # get the string representation of the variable from the symbol list.
-            variable = variables[number]
-            # remove the symbol from the dataframe.
-            self._exploratoryTrain.drop(variable, axis=1)
+        # hyperparameters other than the amount of features only extend the key when they are searched,
+        # values beyond the caps of the memory budget build the same model and share its key
+        return key + (tuple(sorted(self._searchedParams(params).items())),) if params else key
 
-            j += 1
+    def cachedFitness(self, featureMax, exploratoryTraining, responseTraining, fidelity=None):
+        """ Returns the memoised fitness of an amount of features, None when it has not been evaluated in full."""
 
-        # Standardise and transform data
-        xS = self._scaler.fit_transform(self._exploratoryTrain)
+        return self._fitnessCache.get(self._fitnessKey(
+            featureMax, exploratoryTraining, responseTraining, fidelity if fidelity is not None else Fidelity()))
 
-        return xS
+    def recordFitness(self, featureMax, exploratoryTraining, responseTraining, fitness, fidelity=None):
+        """ Memoises a fitness evaluated elsewhere, e.g. by a copy of the classifier in a worker process."""
 
-    def featureImpSplitTest(self, featureMax, orderedIndex):
-        """ Prepares portfolio holder into the splits required for training and testing of machine learning models."""
+        self._fitnessCache.put(self._fitnessKey(
+            featureMax, exploratoryTraining, responseTraining, fidelity if fidelity is not None else Fidelity()), fitness)
+
+    def fitnessEntries(self):
+        """ Returns the memoised fitness values of this process, e.g. to write them to a checkpoint."""
 
-        variables = self._targetVars
-        j = 0
-        # for as long as max features in n_features.
-        for _ in range(0, 12-featureMax):  # for as long as max features in n_features
-            number = orderedIndex[j]  # pop the least important feature
-            numberI = int(number)
-            # get the string representation in the symbol name list
-            variable = variables[numberI]
-            # remove this from the axis of the labels
-            self._exploratoryTest.drop(variable, axis=1)
-            j += 1
+        return self._fitnessCache.snapshot()
 
-        # Standardise and transform data
-        xS = self._scaler.fit_transform(self._exploratoryTest)
+    def restoreFitness(self, entries):
+        """ Memoises the fitness values of a checkpoint again."""
 
-        return xS
+        self._fitnessCache.restore(entries)
 
-    def calculateFitnessPSO(self, featureMax, exploratoryTraining, responseTraining):
+    def setCoreBudget(self, coreBudget):
+        """ Limits the cores used by the cross validation folds of this classifier, e.g. when several candidates
+        are evaluated at once."""
+
+        self._executor.coreBudget = max(1, int(coreBudget))
+
+    def calculateFitnessPSO(self, featureMax, exploratoryTraining, responseTraining, incumbent=None, fidelity=None):
         """ Calculates the fitness of the particle's within the swarm optimisation algorithm by returning the mean absolute error.
+        Fitness values are memoised by dataset, hyperparameters, model configuration and fidelity.
+        The amount of features may be a dictionary of hyperparameters including max_features.
+        When racing, a candidate which cannot beat the incumbent fitness returns early with a lower bound of its error.
          """
 
-        # setting the number of features to the solution
-        model = RandomForestRegressor(
-            n_estimators=100, random_state=0, max_features=featureMax)
+        # evaluations are at full fidelity unless the optimiser schedules a cheaper one
+        fidelity = fidelity if fidelity is not None else Fidelity()
 
-        # 10-fold cross validation
-        fitnessFunc = TimeSeriesSplit(n_splits=10)
+        key = self._fitnessKey(
+            featureMax, exploratoryTraining, responseTraining, fidelity)
 
-        # container variable for accuracy scores
-        outerResults = []
+        cached = self._fitnessCache.get(key)
+        if cached is not None:
+            return cached
+
+        featureMax, params = splitHyperparameters(featureMax)
+        # a low fidelity grows the same share of the searched number of trees as of the default 100
+        params["n_estimators"] = max(1, round(params.get(
+            "n_estimators", Fidelity().nEstimators) * fidelity.nEstimators / Fidelity().nEstimators))
 
         orderedI = self.featureImp(
             exploratoryTraining, responseTraining, featureMax)
 
         exploratoryTrainingFI = self.featureImpSplitTrain(featureMax, orderedI)
 
-        for trainINDEX, testINDEX in fitnessFunc.split(exploratoryTrainingFI, responseTraining):
+        # low fidelities only use the most recent rows
+        exploratoryTrainingFI, responseTraining = fidelity.subsample(
+            exploratoryTrainingFI, responseTraining)
 
-            # Split the data
-            xTrain, xTest = exploratoryTrainingFI[trainINDEX,
-                                                  :], exploratoryTrainingFI[testINDEX, :]
-            yTrain, yTest = responseTraining[trainINDEX], responseTraining[testINDEX]
+        if self._fitnessMode == "oob":
 
-            yTestNP = np.ravel(yTest)
-            yTrainNP = np.ravel(yTrain)
+            averageAcc = self._outOfBagFitness(
+                featureMax, exploratoryTrainingFI, responseTraining, fidelity, params)
+            self._fitnessCache.put(key, averageAcc)
+
+            return averageAcc
+
+        elif self._fitnessMode == "holdout":
+
+            averageAcc = self._holdoutFitness(
+                featureMax, exploratoryTrainingFI, responseTraining, fidelity, params)
+            self._fitnessCache.put(key, averageAcc)
+
+            return averageAcc
+
+        # setting the number of features to the solution
+        model = self._buildModel(
+            random_state=0, max_features=featureMax, **params)
+
+        # 10-fold cross validation at full fidelity
+        fitnessFunc = TimeSeriesSplit(n_splits=fidelity.nSplits)
+
+        if self._racing is not None and incumbent is not None:
 
-            # fit the model using training data
-            model.fit(xTrain, yTrainNP)
+            averageAcc, completed, _ = self._racing.race(
+                model, exploratoryTrainingFI, responseTraining,
+                fitnessFunc.split(exploratoryTrainingFI, responseTraining), incumbent, scheme=repr(fitnessFunc))
 
-            # predict the model using test data
-            predValues = model.predict(xTest)
+            # a bound is not the fitness of the particle, only complete races are memoised
+            if completed:
+                self._fitnessCache.put(key, averageAcc)
+
+            return averageAcc
+
+        # container variable for accuracy scores
+        outerResults = []
+
+        for yTest, predValues in self._crossValidate(model, exploratoryTrainingFI, responseTraining, fitnessFunc):
+
+            yTestNP = np.ravel(yTest)
 
             # Evaluate the validation with specified model
             acc = mean_absolute_error(predValues, yTestNP)
@@ -259,4 +461,201 @@ class RandomForest(Classifier):
 
         averageAcc = mean(outerResults)  # aggregate results
 
+        self._fitnessCache.put(key, averageAcc)
+
         return averageAcc
+
+    def _outOfBagFitness(self, featureMax, exploratoryTraining, responseTraining, fidelity, params):
+        """ Returns the out-of-bag mean absolute error of a single bootstrap forest, over the rows which at least one
+        tree did not draw. Small forests, e.g. at a low fidelity, leave rows which every tree drew and sklearn predicts
+        those as 0. Backends without bagging are scored on the held-out tail block instead."""
+
+        model = self._buildModel(
+            random_state=0, max_features=featureMax, bootstrap=True, oob_score=True,
+            n_jobs=self._executor.coreBudget, **params)
+
+        if "oob_score" not in model.get_params():
+            return self._holdoutFitness(featureMax, exploratoryTraining, responseTraining, fidelity, params)
+
+        response = np.ravel(responseTraining)
+
+        with warnings.catch_warnings():
+            # rows without an out-of-bag prediction are left out below
+            warnings.filterwarnings("ignore", message="Some inputs do not have OOB scores")
+            model.fit(exploratoryTraining, response)
+            # the same random state draws the same rows for every tree whatever the response, so a forest of a constant
+            # response predicts 1 out-of-bag for every row some tree left out and 0 for the rest, its trees are single leaves
+            probe = clone(model).fit(exploratoryTraining, np.ones(len(response)))
+
+        scored = probe.oob_prediction_ > 0.5
+        if not np.any(scored):
+            return self._holdoutFitness(featureMax, exploratoryTraining, responseTraining, fidelity, params)
+
+        # every row is predicted only by the trees which did not draw it
+        return mean_absolute_error(model.oob_prediction_[scored], response[scored])
+
+    def _holdoutFitness(self, featureMax, exploratoryTraining, responseTraining, fidelity, params):
+        """ Returns the mean absolute error of a single fit scored on the most recent block of rows,
+        the same size as one fold of the time series split."""
+
+        model = self._buildModel(
+            random_state=0, max_features=featureMax, **params)
+
+        rows = len(responseTraining)
+        tail = rows // (fidelity.nSplits + 1)
+        split = (np.arange(rows - tail), np.arange(rows - tail, rows))
+
+        fold, = self._executor.runFolds(
+            model, exploratoryTraining, responseTraining, [split], scheme="HoldOut(tail={})".format(tail))
+
+        return float(fold["mae"])
+
+    def calculateMultiHorizon(self, exploratoryTesting, responseTesting, confirm, horizons=(1, 5, 21)):
+        """ Returns the mean absolute error and root mean squared error of every forecast horizon,
+        obtained from a single multi-output random forest fitted to all horizons at once.
+        The horizons (in rows) of the labels set the gap between the training and test rows of every time series split."""
+
+        if not self._backend.multiOutput:
+            raise ValueError("The '{}' backend cannot fit several horizons at once.".format(self._backend.name))
+
+        # One forest shares its trees between every column of the response
+        model = self._buildModel(
+            n_estimators=100, random_state=0)
+
+        if confirm == 2:
+
+            # 10-fold cross validation
+            fitnessFunct = KFold(n_splits=10)
+
+        else:
+
+            # 10-fold cross validation, the labels of the last training rows look ahead into the test rows
+            fitnessFunct = TimeSeriesSplit(n_splits=10, gap=max(horizons))
+
+        # container variable for accuracy scores, one row per fold
+        outerResults = []
+        outerResults2 = []
+
+        for yTest, predValues in self._crossValidate(model, exploratoryTesting, responseTesting, fitnessFunct, record=True):
+
+            # Evaluate the validation of every horizon separately
+            acc = mean_absolute_error(
+                predValues, yTest, multioutput="raw_values")
+            acc2 = mean_squared_error(
+                predValues, yTest, multioutput="raw_values", squared=False)
+
+            # store results in outer lists
+            outerResults.append(acc)
+            outerResults2.append(acc2)
+
+        # aggregate results per horizon
+        averageAccMAE = mean(outerResults, axis=0)
+        averageAccRMSE = mean(outerResults2, axis=0)
+
+        return averageAccMAE, averageAccRMSE
+
+    def calculateLearningCurve(self, exploratoryTesting, responseTesting, confirm, stages=(25, 50, 100, 200), featureMax=None):
+        """ Returns the mean absolute error and root mean squared error for every ensemble size in stages.
+        One ensemble per fold is grown with warm start, so the whole curve costs the fits of the largest stage.
+        When the amount of features (or dictionary of hyperparameters) found by the optimiser is given, the curve is
+        that of the rf-pso model on its most important features, otherwise that of the baseline on every feature."""
+
+        stages = sorted(set(int(stage) for stage in stages))
+
+        if featureMax is None:
+
+            model = self._buildModel(
+                n_estimators=stages[0], random_state=0)
+
+        else:
+
+            featureMax, params = splitHyperparameters(featureMax)
+            # the size of the ensemble is set by every stage
+            params.pop("n_estimators", None)
+
+            model = self._buildModel(
+                n_estimators=stages[0], random_state=0, max_features=featureMax, **params)
+
+            # the columns of the most important features, as in calculateModelAccuracy
+            orderedI = self.featureImp(
+                exploratoryTesting, responseTesting, featureMax)
+            exploratoryTesting = self.featureImpSplitTest(featureMax, orderedI)
+
+        # forests grow trees, boosting grows iterations
+        params = model.get_params()
+        sizeParam = "n_estimators" if "n_estimators" in params else "max_iter"
+        if "warm_start" not in params or sizeParam not in params:
+            raise ValueError("The '{}' backend cannot be grown incrementally.".format(
+                self._backend.name))
+        model.set_params(warm_start=True)
+
+        if confirm == 2:
+
+            # 10-fold cross validation
+            fitnessFunct = KFold(n_splits=10)
+
+        else:
+
+            # 10-fold cross validation
+            fitnessFunct = TimeSeriesSplit(n_splits=10)
+
+        # one row per fold, one column per stage, (mae, rmse) pairs
+        foldScores = np.asarray(self._executor.mapFolds(
+            partial(_growFold, stages=stages, sizeParam=sizeParam), model, exploratoryTesting, responseTesting,
+            fitnessFunct.split(exploratoryTesting, responseTesting)))
+
+        # aggregate results per stage
+        averageAcc = foldScores.mean(axis=0)
+
+        return {stage: (averageAcc[index, 0], averageAcc[index, 1]) for index, stage in enumerate(stages)}
+
+    def cheapestTreeCount(self, learningCurve, targetMAE=None, tolerance=0.01):
+        """ Returns the smallest ensemble size of a learning curve which reaches the target mean absolute error.
+        Without a target, the smallest size within the relative tolerance of the best error on the curve is returned."""
+
+        if targetMAE is None:
+            targetMAE = min(mae for mae, _ in learningCurve.values()) * \
+                (1 + tolerance)
+
+        for stage in sorted(learningCurve):
+            if learningCurve[stage][0] <= targetMAE:
+                return stage
+
+        # no stage reaches the target, the largest ensemble is the closest
+        return max(learningCurve)
+
+    def fitFinalModel(self, featureMax, exploratoryTesting, responseTesting):
+        """ Fits the proposed model once on every row with the features chosen by the optimiser.
+        Returns the fitted model and the metadata needed to reproduce its inputs at prediction time."""
+
+        featureMax, params = splitHyperparameters(featureMax)
+        hyperparameters = self._searchedParams(params)
+
+        orderedI = self.featureImp(
+            exploratoryTesting, responseTesting, featureMax)
+        columns = self._selectColumns(featureMax, orderedI)
+
+        exploratoryTestingFI = self.featureImpSplitTest(featureMax, orderedI)
+
+        model = self._buildModel(
+            n_estimators=params.pop("n_estimators", 100), random_state=0, max_features=featureMax,
+            n_jobs=self._executor.coreBudget, **params)
+        model.fit(exploratoryTestingFI, np.ravel(responseTesting))
+
+        # standardisation of the selected features, applied again to new rows before prediction
+        selected = self._exploratoryTest.iloc[:, columns]
+
+        metadata = {"features": [self._targetVars[column] for column in columns],
+                    "featureMax": int(featureMax),
+                    "hyperparameters": hyperparameters,
+                    "featureMeans": selected.mean().tolist(),
+                    "featureScales": selected.std(ddof=0).tolist(),
+                    # range of the winsorized features, new rows are clipped to it
+                    "featureLower": selected.min().tolist(),
+                    "featureUpper": selected.max().tolist(),
+                    "backend": self._backend.name,
+                    "memoryBudget": self._memoryBudget.params() if self._memoryBudget is not None else {},
+                    "footprint": modelFootprint(model),
+                    "dataHash": hashDataset(exploratoryTesting, responseTesting)}
+
+        return model, metadata
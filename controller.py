@@ -3,15 +3,29 @@ from __future__ import annotations
 from abc import ABC, abstractmethod
 import re
 import sys
+import functools
+import os
+from datetime import datetime
+import numpy as np
 import logging
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
 from colours import Colours
 from interface import OutputUI, stringOutputUI, warningUI
 from reporter import ReportEditor, ReportManager
-from processor import Director, ConcreteProcessor
+from processor import Director, ConcreteProcessor, targetVariables
+from labeller import ForwardLabeller
 from classifier import RandomForest
+from executor import FoldExecutor
+from cache import DirectoryStore
+from modelstore import ModelStore
+from predictor import BatchPredictor
+from portfolio import PortfolioEvaluator, nasdaq100
+from memory import formatBytes
+from metrics import directionalAccuracy
+from searchers import createOptimiser
 from optimiser import Heuristic
+from telemetry import JsonLinesTelemetry
 
 
 class IFacade(ABC):
@@ -46,7 +60,7 @@ class Facade(IFacade):
 
     Methods are convenient shortcuts to sophisticated functionality of the subsystem."""
 
-    def __init__(self, subsystem1: ReporterUI, subsystem2: PortfolioManagerUI, output: OutputUI, stringout: stringOutputUI, col: Colours, warning: warningUI) -> None:
+    def __init__(self, subsystem1: ReporterUI, subsystem2: PortfolioManagerUI, output: OutputUI, stringout: stringOutputUI, col: Colours, warning: warningUI, backend="randomforest", fitnessMode="cv", racing=None, multiFidelity=False, memoryBudget=None, searchSpace=None, stopping=None, checkpoints=None, asynchronous=False, optimiser="pso", telemetry=None, foldStore=None, foldStoreSize=4096, exhaustive=None) -> None:
         """Providing the facade with existing subsystem objects"""
 
         self._col = col
@@ -56,6 +70,44 @@ class Facade(IFacade):
         self._intUI = output
         self._stringUI = stringout
         self._scaler = StandardScaler()
+        # estimator backend evaluated by the classifier during this run
+        self._backend = backend
+        # how particles are scored during optimisation, the final evaluation always uses full cross validation
+        self._fitnessMode = fitnessMode
+        # racing bound ('safe' or 'optimistic') for abandoning hopeless particles, None scores every fold
+        self._racing = racing
+        # low fidelity screening of the swarm with full fidelity promotion of the final candidates
+        self._multiFidelity = multiFidelity
+        # caps on tree growth (depth, rows per leaf, rows per tree) of the memory-bounded training mode
+        self._memoryBudget = memoryBudget
+        # hyperparameters searched by the swarm, None searches the amount of features alone
+        self._searchSpace = searchSpace
+        # budgets and convergence tests ending the swarm, None runs the default three generations
+        self._stopping = stopping
+        # directory of the swarm checkpoints of every symbol, None never saves them
+        self._checkpoints = checkpoints
+        # steady state swarm which moves every particle as soon as its evaluation returns
+        self._asynchronous = asynchronous
+        # registered optimiser tuning the classifier: 'pso', 'random', 'tpe' or 'halving'
+        self._optimiser = optimiser
+        # True always evaluates every point of the search space, False always searches it,
+        # None evaluates small spaces exhaustively unless a setting only applies to a search
+        if exhaustive and racing is not None:
+            raise ValueError("Racing needs the incumbents of a search, it does not apply to an exhaustive search.")
+        self._exhaustive = exhaustive
+        # JSON lines file recording the work, cache hits and global best trajectory of every optimisation, None records nothing
+        self._telemetry = JsonLinesTelemetry(telemetry) if telemetry is not None else None
+        # directory in which fold results persist between sessions so identical fits are never repeated,
+        # holding at most foldStoreSize folds, None fits every fold again
+        self._foldStore = DirectoryStore(foldStore, foldStoreSize) if foldStore is not None else None
+        self._executor = FoldExecutor(foldStore=self._foldStore)
+        # settings the chosen optimiser does not support, or which conflict, are rejected before any data is processed
+        # by building it once without a classifier
+        createOptimiser(self._optimiser, None, **self.optimiserOptions(self._executor, None))
+        # final models are kept so predictions do not require retraining
+        self._modelStore = ModelStore("models")
+        # standardisation of the response, saved with the final model
+        self._responseStatistics = {}
 
     def handleUserMenuRequest(self):
         """ This method is responsible for orchastrating the classes involved during the start up to portfolio management processes."""
@@ -134,6 +186,7 @@ class Facade(IFacade):
         if confirm == 1:
 
             xTrain, yTrain, xTest, yTest, targetVARS, exploratoryTraining, exploratoryTesting = director.processingHandler()
+            self._responseStatistics = director.responseStatistics()
 
             return xTrain, yTrain, xTest, yTest, targetVARS, exploratoryTraining, exploratoryTesting
 
@@ -149,28 +202,69 @@ class Facade(IFacade):
 
             return xTest, yTest, empty, emptier, evenEmptier, yesEmpty, moreEmpty
 
-    def orchastrateEvaluation(self, xTrain, yTrain, xTest, yTest, confirm, targetVARS, exploratoryTraining, exploratoryTesting) -> float:
+    def orchastrateMultiHorizon(self, sList, correctSymb, startPeriod, endPeriod, labeller=None) -> tuple:
+        """This method is responsible for the multi-horizon model: the forward labels of every horizon are created and
+        a single random forest is evaluated on all of them with time series splits.
+        Returns the mean absolute error and root mean squared error of every horizon."""
+
+        labeller = labeller or ForwardLabeller()
+
+        # Preprocessing module
+        director = Director(sList[correctSymb],
+                            self._scaler, startPeriod, endPeriod, self._col)
+        builder = ConcreteProcessor(self._col)
+        director.builder = builder
+
+        xTrain, yTrain, xTest, yTest = director.processingHandlerMH(labeller)
+
+        # Machine learning module, evaluated on the test period like the other random forest models,
+        # always by a forest since not every backend fits several horizons at once
+        classifier = RandomForest(
+            list(targetVariables), self._scaler, None, None, executor=self._executor, memoryBudget=self._memoryBudget)
+        mae, rmse = classifier.calculateMultiHorizon(xTest, yTest, 3, labeller.horizons())
+
+        self.reportMemoryUsage(self._executor)
+        self._intUI.displayMultiHorizonResults(labeller.labelNames(), mae, rmse)
+
+        return mae, rmse
+
+    def orchastrateEvaluation(self, xTrain, yTrain, xTest, yTest, confirm, targetVARS, exploratoryTraining, exploratoryTesting, ticker=None, executor=None) -> float:
         """ This method is repsonsible for orchatsrating the machine learning component of the proggram.
-        Returns the mean absolute error and root mean squared error of all three models."""
+        Returns the mean absolute error and root mean squared error of all three models.
+        When the ticker is given, the out-of-fold predictions are saved and the final RF-PSO model is saved to the model store.
+        The executor overrides the fold executor of the facade, e.g. with a smaller core budget."""
 
+        executor = executor or self._executor
         # instantiating random forest class
         classifier = RandomForest(
-            targetVARS, self._scaler, exploratoryTraining, exploratoryTesting)
+            targetVARS, self._scaler, exploratoryTraining, exploratoryTesting, executor=executor, backend=self._backend,
+            fitnessMode=self._fitnessMode, racing=self._racing, memoryBudget=self._memoryBudget)
 
         if confirm == 1:
 
             print("--------------------------------------Optimising Parameters------------------------------------")
 
             # Run PSO algorithm in order to get list of global best solution
-            number = 0
-            # initialising with parameter to represent dimension of problem
-            pso = Heuristic(number, classifier)
+            pso = createOptimiser(self._optimiser, classifier,
+                                  **self.optimiserOptions(executor, ticker))
             optimalParam = pso.metaOpt(xTrain, yTrain, classifier)
 
             print("Evaluating Classifier...")
             mae, rmse = classifier.calculateModelAccuracy(
                 optimalParam, xTest, yTest)
 
+            if self._telemetry is not None:
+                # ties the optimisation run to the symbol and the accuracy of its result
+                self._telemetry.record("evaluation", run=pso.run, ticker=ticker, result=optimalParam, mae=mae, rmse=rmse)
+
+            if ticker is not None:
+                self.saveFinalModel(classifier, optimalParam,
+                                    xTest, yTest, ticker, mae, rmse)
+
+            self.reportMemoryUsage(executor)
+            if ticker is not None:
+                self.saveOutOfFold(classifier, ticker, confirm)
+
             return mae, rmse
 
         elif confirm == 2:
@@ -178,6 +272,10 @@ class Facade(IFacade):
             mae, rmse = classifier.calculateRandomForest(
                 xTrain, yTrain, confirm)
 
+            self.reportMemoryUsage(executor)
+            if ticker is not None:
+                self.saveOutOfFold(classifier, ticker, confirm)
+
             return mae, rmse
 
         else:
@@ -186,8 +284,133 @@ class Facade(IFacade):
             mae, rmse = classifier.calculateRandomForest(
                 xTrain, yTrain, confirm)
 
+            self.reportMemoryUsage(executor)
+            if ticker is not None:
+                self.saveOutOfFold(classifier, ticker, confirm)
+
             return mae, rmse
 
+    def optimiserOptions(self, executor, ticker) -> dict:
+        """ This method is responsible for the settings of the optimiser, those of the particle swarm alone are only passed when set
+        so that any other optimiser rejects them."""
+
+        options = {"coreBudget": executor.coreBudget, "searchSpace": self._searchSpace,
+                   "stopping": self._stopping, "telemetry": self._telemetry, "exhaustive": self._exhaustive}
+
+        if self._exhaustive is None and self._racing is not None:
+            # racing abandons candidates against incumbents, which only a search has
+            options["exhaustive"] = False
+
+        if self._optimiser == Heuristic.name:
+            # initialising with parameter to represent dimension of problem, 0 mixes every initialisation scheme
+            number = 0
+            options["number"] = number
+
+        if self._multiFidelity:
+            options["multiFidelity"] = True
+        if self._checkpoints is not None:
+            options["checkpoint"] = self.checkpointPath(ticker)
+        if self._asynchronous:
+            options["asynchronous"] = True
+
+        return options
+
+    def checkpointPath(self, ticker):
+        """ This method is responsible for naming the swarm checkpoint of a symbol, None when checkpoints are switched off."""
+
+        if self._checkpoints is None:
+            return None
+
+        return os.path.join(self._checkpoints, "{}.pkl".format(ticker or "swarm"))
+
+    def reportMemoryUsage(self, executor) -> dict:
+        """ This method is responsible for displaying the number of models fitted during cross validation, the footprint of their trees
+        and the peak memory of a fit. The footprint of the final model is displayed when it is saved."""
+
+        usage = executor.memoryUsage()
+        if usage["models"] > 0:
+            print(self._col.getBold() + self._col.getPurple() + "[ALERT]" + self._col.getEnd() +
+                  " " + str(usage["models"]) + " models fitted - footprint " + formatBytes(usage["footprint"]) +
+                  " in total, " + formatBytes(usage["peakFootprint"]) + " for the largest model" +
+                  " - peak memory growth of a fit " + formatBytes(usage["peakFitMemory"]) + ".")
+
+        return usage
+
+    def evaluateTicker(self, ticker, coreBudget, startPeriod, endPeriod, confirm) -> float:
+        """ This method is responsible for the processing and evaluation of a single ticker within a share of the cores.
+        Returns the mean absolute error and root mean squared error of the selected model."""
+
+        executor = FoldExecutor(coreBudget, foldStore=self._foldStore)
+
+        xTrain, yTrain, xTest, yTest, targetVARS, exploratoryTraining, exploratoryTesting = self.orchastrateProcessing(
+            [ticker], 0, startPeriod, endPeriod, confirm)
+
+        # the predictions and final RF-PSO model of every ticker are saved under its ticker
+        return self.orchastrateEvaluation(xTrain, yTrain, xTest, yTest, confirm, targetVARS, exploratoryTraining,
+                                          exploratoryTesting, ticker, executor)
+
+    def orchastratePortfolioEvaluation(self, sList, startPeriod, endPeriod) -> pd.DataFrame:
+        """ This method is responsible for evaluating the chosen model across every symbol of the portfolio, or of the NASDAQ-100,
+        in parallel. Returns the table of per ticker results followed by their aggregate."""
+
+        confirm, scope = self._intUI.portfolioMenu()
+        tickers = sList if scope == 1 else nasdaq100
+
+        evaluator = PortfolioEvaluator(self._executor.coreBudget)
+        print("-------------------------------------Evaluating Portfolio--------------------------------------")
+        print("Evaluating " + str(len(tickers)) + " symbols across " +
+              str(evaluator.coreBudget) + " cores...")
+
+        results = evaluator.evaluatePortfolio(tickers, functools.partial(
+            self.evaluateTicker, startPeriod=startPeriod, endPeriod=endPeriod, confirm=confirm))
+        summary = evaluator.summarise(results)
+
+        self._intUI.displayPortfolioResults(summary, confirm)
+
+        return summary
+
+    def saveOutOfFold(self, classifier, ticker, confirm) -> str:
+        """ This method is responsible for saving the out-of-fold predictions of an evaluation, so that further metrics need no refit."""
+
+        modes = {1: "rf-pso", 2: "rf", 3: "rf-tss"}
+        path = os.path.join("predictions", str(ticker), modes.get(confirm, str(confirm)) + "-" +
+                            datetime.now().strftime("%Y%m%d-%H%M%S") + ".npz")
+        classifier.outOfFold.save(path)
+
+        accuracy = classifier.outOfFold.inTimeOrder().score(directionalAccuracy)
+        print(self._col.getBold() + self._col.getPurple() + "[ALERT]" + self._col.getEnd() +
+              " Out-of-fold predictions saved to " + path + " (directional accuracy " + "{:.1%}".format(float(np.mean(accuracy))) + ").")
+
+        return path
+
+    def saveFinalModel(self, classifier, optimalParam, xTest, yTest, ticker, mae, rmse) -> int:
+        """ This method is responsible for fitting the final model and saving it as a new version in the model store."""
+
+        print("Saving Final Model...")
+        model, metadata = classifier.fitFinalModel(optimalParam, xTest, yTest)
+        metadata.update({"ticker": ticker,
+                         "metrics": {"mae": float(mae), "rmse": float(rmse)}})
+        metadata.update(self._responseStatistics)
+
+        version = self._modelStore.saveModel(model, metadata)
+        print(self._col.getBold() + self._col.getPurple() + "[ALERT]" + self._col.getEnd() +
+              " Model for " + str(ticker) + " saved as version " + str(version) +
+              " (" + formatBytes(metadata["footprint"]) + ").")
+
+        return version
+
+    def orchastrateBatchPrediction(self, tickers, startPeriod, endPeriod, modelMap=None) -> pd.DataFrame:
+        """ This method is responsible for scoring many tickers over a date range with the saved models, without retraining."""
+
+        predictor = BatchPredictor(self._modelStore, self._col)
+        predictions = predictor.predictBatch(
+            tickers, startPeriod, endPeriod, modelMap)
+
+        print(self._col.getBold() + self._col.getPurple() + "[ALERT]" + self._col.getEnd() +
+              " " + str(len(predictions)) + " predictions made for " + str(predictions["ticker"].nunique()) + " tickers.")
+
+        return predictions
+
     def orchastrateReportProcessing(self, correctSymb, tList, name, surname, rmse, mae, confirm) -> int:
         """This method is responsible for orchastrating the classes involved in the report management process."""
 
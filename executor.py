@@ -0,0 +1,228 @@
+""" This module is responsible for executing cross validation folds in parallel within a global core budget."""
+
+from __future__ import annotations
+from abc import ABC, abstractmethod
+import math
+import os
+import numpy as np
+import joblib
+import sklearn
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from threadpoolctl import threadpool_limits
+from cache import hashDataset
+from memory import PeakMemory, treeFootprint
+
+# parameters which change how fast a fit runs but never what it produces
+_runtimeParams = ("n_jobs", "verbose")
+# a persisted fold is only reused by the library versions which fitted it
+_libraryVersions = (("scikit-learn", sklearn.__version__), ("joblib", joblib.__version__))
+
+
+def resolveCoreBudget(coreBudget=None) -> int:
+    """ Returns the number of cores of a budget, every core of the machine when it is None."""
+
+    return max(1, int(coreBudget or os.cpu_count() or 1))
+
+
+def allocateCores(coreBudget, nTasks) -> tuple:
+    """ Returns the number of workers running nTasks tasks within the core budget and the cores given to each of them.
+    The split minimises the rounds of tasks per worker divided by the cores per task,
+    preferring task level parallelism when two splits are equally fast."""
+
+    bestWorkers, bestJobs, bestCost = 1, coreBudget, math.inf
+
+    for workers in range(1, min(nTasks, coreBudget) + 1):
+        jobs = coreBudget // workers
+        cost = math.ceil(nTasks / workers) / jobs
+
+        if cost <= bestCost:
+            bestWorkers, bestJobs, bestCost = workers, jobs, cost
+
+    return bestWorkers, bestJobs
+
+
+def _runFold(function, model, exploratory, response, trainINDEX, testINDEX, treeJobs):
+    """ Runs a fold function on one fold of a cross validation.
+    Native thread pools (BLAS, OpenMP) are limited to the tree level share of the core budget."""
+
+    with threadpool_limits(limits=treeJobs):
+        return function(model, exploratory, response, trainINDEX, testINDEX)
+
+
+def trainingResponse(response, trainINDEX):
+    """ Returns the response of the training rows, flattened when there is a single output column."""
+
+    yTrain = response[trainINDEX]
+    if yTrain.ndim == 2 and yTrain.shape[1] == 1:
+        yTrain = np.ravel(yTrain)
+
+    return yTrain
+
+
+def orderedPredict(model, exploratory):
+    """ Predicts with a single job so that the trees are always summed in the same order.
+    Parallel prediction accumulates trees in whichever order threads finish, which changes the last bits of the result."""
+
+    params = model.get_params()
+    if params.get("n_jobs") in (None, 1):
+        return model.predict(exploratory)
+
+    model.set_params(n_jobs=1)
+    try:
+        return model.predict(exploratory)
+    finally:
+        model.set_params(n_jobs=params["n_jobs"])
+
+
+def _fitFold(model, exploratory, response, trainINDEX, testINDEX):
+    """ Fits a fresh copy of the model on the training rows of one fold and predicts its test rows."""
+
+    # growth of the memory of the process while it fits the fold
+    with PeakMemory() as fitMemory:
+        model.fit(exploratory[trainINDEX, :], trainingResponse(response, trainINDEX))
+    predValues = orderedPredict(model, exploratory[testINDEX, :])
+
+    # metrics of every output column of the fold
+    residuals = predValues - np.reshape(response[testINDEX], np.shape(predValues))
+
+    return {"predictions": predValues,
+            "testIndex": np.asarray(testINDEX),
+            "mae": np.mean(np.abs(residuals), axis=0),
+            "rmse": np.sqrt(np.mean(residuals ** 2, axis=0)),
+            "fitMemory": fitMemory.growth,
+            # only the trees of a forest are measured, pickling any other model would cost as much as the fit
+            "footprint": treeFootprint(model)}
+
+
+def estimatorKey(model) -> tuple:
+    """ Returns the hyperparameters of an estimator which determine its fitted result, as a hashable key."""
+
+    return (type(model).__name__,) + tuple(
+        (name, repr(value)) for name, value in sorted(model.get_params().items()) if name not in _runtimeParams)
+
+
+class Executor(ABC):
+    """ Executor interface for running the folds of a cross validation."""
+
+    @abstractmethod
+    def allocate(self, nFolds) -> tuple:
+        pass
+
+    @abstractmethod
+    def runFolds(self, model, exploratory, response, splits, scheme=None, indices=None) -> list:
+        pass
+
+    @abstractmethod
+    def mapFolds(self, function, model, exploratory, response, splits) -> list:
+        pass
+
+    @abstractmethod
+    def memoryUsage(self) -> dict:
+        pass
+
+
+class FoldExecutor(Executor):
+
+    """ Runs cross validation folds across a process pool.
+
+    The core budget is split between fold level workers and the n_jobs of each estimator so that
+    the two levels of parallelism never oversubscribe the machine. Estimators are cloned per fold
+    and results are returned in fold order, so they do not depend on the number of workers.
+
+    When a fold store is given, the result of every fold is persisted under the dataset, split scheme,
+    fold index, estimator parameters and library versions, and only folds which have never been seen are fitted."""
+
+    def __init__(self, coreBudget=None, foldStore=None):
+        self.coreBudget = resolveCoreBudget(coreBudget)
+        self._foldStore = foldStore
+        # models fitted by this executor, the largest growth of memory while fitting one of them
+        # and the bytes held by the trees of all of them and of the largest
+        self._fittedModels = 0
+        self._peakFitMemory = None
+        self._totalFootprint = None
+        self._peakFootprint = None
+
+    def allocate(self, nFolds):
+        """ Returns the number of fold workers and the tree level jobs given to each of them."""
+
+        return allocateCores(self.coreBudget, nFolds)
+
+    def foldKeys(self, model, exploratory, response, indices, scheme):
+        """ Returns the fold store key of every fold number of a cross validation."""
+
+        dataKey = hashDataset(exploratory, response)
+        modelKey = estimatorKey(model)
+
+        return [(dataKey, scheme, index, modelKey, _libraryVersions) for index in indices]
+
+    def runFolds(self, model, exploratory, response, splits, scheme=None, indices=None):
+        """ Fits the model on every (train, test) split and returns the result of each test fold in fold order.
+        Each result holds the fold's predictions, test indices, mean absolute error, root mean squared error,
+        the growth of the resident set size of the process while it fitted the model and the bytes held by its trees.
+        Indices are the fold numbers of the splits within the scheme, by default their positions."""
+
+        splits = list(splits)
+        results = [None] * len(splits)
+
+        # the split scheme identifies the folds, without one nothing can be persisted
+        persist = self._foldStore is not None and scheme is not None
+        if persist:
+            indices = range(len(splits)) if indices is None else indices
+            keys = self.foldKeys(model, exploratory, response, indices, scheme)
+            results = [self._foldStore.get(key) for key in keys]
+
+        missing = [index for index, result in enumerate(results) if result is None]
+        if not missing:
+            return results
+
+        computed = self.mapFolds(_fitFold, model, exploratory, response, [
+                                 splits[index] for index in missing])
+
+        for index, result in zip(missing, computed):
+            results[index] = result
+            self._recordMemory(result)
+            if persist:
+                self._foldStore.put(keys[index], result)
+
+        return results
+
+    def _recordMemory(self, result):
+
+        self._fittedModels += 1
+        if result.get("fitMemory") is not None:
+            self._peakFitMemory = max(self._peakFitMemory or 0, result["fitMemory"])
+        if result.get("footprint") is not None:
+            self._totalFootprint = (self._totalFootprint or 0) + result["footprint"]
+            self._peakFootprint = max(self._peakFootprint or 0, result["footprint"])
+
+    def memoryUsage(self):
+        """ Returns the number of models fitted by runFolds, the largest growth in bytes of the resident set size
+        of a process while it fitted one of them and the bytes held by the trees of all fitted models and of the largest
+        (None where they cannot be measured)."""
+
+        return {"models": self._fittedModels,
+                "peakFitMemory": self._peakFitMemory,
+                "footprint": self._totalFootprint,
+                "peakFootprint": self._peakFootprint}
+
+    def mapFolds(self, function, model, exploratory, response, splits):
+        """ Calls function(model, exploratory, response, trainINDEX, testINDEX) on every split with a fresh
+        copy of the model, and returns the results in fold order. The function must be defined at module level."""
+
+        splits = list(splits)
+        foldWorkers, treeJobs = self.allocate(len(splits))
+
+        tasks = []
+        for trainINDEX, testINDEX in splits:
+            foldModel = clone(model)
+            if "n_jobs" in foldModel.get_params():
+                foldModel.set_params(n_jobs=treeJobs)
+            tasks.append(delayed(_runFold)(function, foldModel, exploratory,
+                         response, trainINDEX, testINDEX, treeJobs))
+
+        if foldWorkers == 1:
+            # no process pool is needed for a single worker
+            return [task(*args, **kwargs) for task, args, kwargs in tasks]
+
+        return Parallel(n_jobs=foldWorkers, backend="loky")(tasks)
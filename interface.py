@@ -326,6 +326,18 @@ class AbstractOutput(ABC):
     def displayResults(self, tList, rmse, mae, confirm) -> None:
         pass
 
+    @abstractmethod
+    def portfolioMenu(self) -> tuple:
+        pass
+
+    @abstractmethod
+    def displayPortfolioResults(self, summary, confirm) -> None:
+        pass
+
+    @abstractmethod
+    def displayMultiHorizonResults(self, labelNames, mae, rmse) -> None:
+        pass
+
     @abstractmethod
     def reportManagement(self, fName, lName, accessLevel) -> int:
         pass
@@ -680,13 +692,15 @@ class OutputUI(AbstractOutput):
             "2. Evaluate 'Random Forest' model accuracy.")
         print("3. Evaluate 'Random Forest with time series splits' model accuracy.")
         print("4. Exit.")
+        print("5. Evaluate a model across every symbol of the portfolio.")
+        print("6. Evaluate 'Random Forest' forecasts of several horizons at once.")
         print()
         choice = self._warningUI.inputMessageInteger()
 
         # regex search condition to check for presence of anything other than the number we need
         m = re.search("[^0-9]", choice)
-        correct = re.search("[1-4]", choice)
-        outOfRange = re.search("[5-9]", choice)
+        correct = re.search("[1-6]", choice)
+        outOfRange = re.search("[7-9]", choice)
 
         if m:
             error = 0  # set counter variable = 0
@@ -699,12 +713,12 @@ class OutputUI(AbstractOutput):
                 self._warningUI.matchedNotNumber()
                 choice = self._warningUI.inputMessageInteger()
                 # regex search condition to check for presence of anything other than the number we need
-                correct = re.search("[1-4]", choice)
+                correct = re.search("[1-6]", choice)
 
                 if correct:
                     choices = int(choice)
                     self.optionViewer(choices)
-                    if choices < 4:
+                    if choices != 4:
                         print(self._cols.getBold() + self._cols.getItalic() +
                               "Progressing to data download..." + self._cols.getEnd())
                     elif choices == 4:
@@ -715,7 +729,7 @@ class OutputUI(AbstractOutput):
         elif correct:
             choices = int(choice)
             self.optionViewer(choices)
-            if choices < 4:
+            if choices != 4:
                 print(self._cols.getBold() + self._cols.getItalic() +
                       "Progressing to data download..." + self._cols.getEnd())
             elif choices == 4:
@@ -733,12 +747,12 @@ class OutputUI(AbstractOutput):
                 self._warningUI.outOfRange()  # function call for error message
                 choice = self._warningUI.inputMessageInteger()
                 # regex search condition to check for presence of anything other than the number we need
-                correct = re.search("[1-4]", choice)
+                correct = re.search("[1-6]", choice)
 
                 if correct:
                     choices = int(choice)
                     self.optionViewer(choices)
-                    if choices < 4:
+                    if choices != 4:
                         print(self._cols.getBold() + self._cols.getItalic() +
                               "Progressing to data download..." + self._cols.getEnd())
                     elif choices == 4:
@@ -757,12 +771,12 @@ class OutputUI(AbstractOutput):
                 self._warningUI.emptyInput()
                 choice = self._warningUI.inputMessageInteger()
                 # regex search condition to check for presence of anything other than the number we need
-                correct = re.search("[1-4]", choice)
+                correct = re.search("[1-6]", choice)
 
                 if correct:
                     choices = int(choice)
                     self.optionViewer(choices)
-                    if choices < 4:
+                    if choices != 4:
                         print(self._cols.getBold() + self._cols.getItalic() +
                               "Progressing to data download..." + self._cols.getEnd())
                     elif choices == 4:
@@ -873,6 +887,12 @@ class OutputUI(AbstractOutput):
         elif confirm == 4:
             message = "Quit the program."
             return message
+        elif confirm == 5:
+            model = self._cols.getBold() + "Portfolio evaluation" + self._cols.getEnd()
+            return model
+        elif confirm == 6:
+            model = self._cols.getBold() + "Multi-horizon Random Forest" + self._cols.getEnd()
+            return model
 
     def displayResults(self, tList, rmse, mae, confirm):
         """ This methods displays the model results obtained for the selected stock symbol."""
@@ -889,6 +909,78 @@ class OutputUI(AbstractOutput):
         print(self._cols.getBold() + self._cols.getItalic() +
               "Progressing to report creation..." + self._cols.getEnd())
 
+    def optionSelector(self, question, options):
+        """This method displays numbered options and collects a valid choice, allowing three attempts before shut down."""
+
+        print(question)
+        for number, option in enumerate(options, start=1):
+            print(str(number) + ". " + option + ".")
+        print()
+
+        error = 0  # set counter variable = 0
+        while True:
+            choice = self._warningUI.inputMessageInteger()
+
+            # regex search condition to check for a number within the range of options
+            if re.fullmatch("[1-" + str(len(options)) + "]", choice):
+                return int(choice)
+
+            # function call to error validator
+            self._warningUI.validateError(error)
+            error += 1  # increase counter variable by 1
+            if not choice:
+                self._warningUI.emptyInput()
+            elif re.search("[^0-9]", choice):
+                self._warningUI.matchedNotNumber()
+            else:
+                self._warningUI.outOfRange()
+
+    def portfolioMenu(self):
+        """This method collects the model to evaluate and the symbols to evaluate it on during portfolio evaluation."""
+
+        print("------------------------------------------Portfolio Menu------------------------------------------")
+        confirm = self.optionSelector("Which model would you like to evaluate across the portfolio?", [
+            "Evaluate 'Random Forest-PSO' model accuracy",
+            "Evaluate 'Random Forest' model accuracy",
+            "Evaluate 'Random Forest with time series splits' model accuracy"])
+        self.optionViewer(confirm)
+
+        scope = self.optionSelector("Which symbols should the model be evaluated on?", [
+            "Every symbol in my portfolio",
+            "Every symbol in the NASDAQ-100 index"])
+        print(self._cols.getBold() + self._cols.getItalic() +
+              "Progressing to data download..." + self._cols.getEnd())
+
+        return confirm, scope
+
+    def displayPortfolioResults(self, summary, confirm):
+        """ This methods displays the model results obtained for every stock symbol of the portfolio, followed by the aggregate."""
+
+        print("-------------------------------------Portfolio Results-------------------------------------------")
+        print(self._cols.getBold() + self._cols.getPurple() +
+              "[ALERT]" + self._cols.getEnd() + " Displaying...")
+        print("Model: " + self.modeSelection(confirm))
+        print(summary.to_string(index=False, na_rep="-",
+              float_format=lambda value: "{:.6f}".format(value)))
+
+        failed = summary.loc[summary["error"] != "", "ticker"]
+        if len(failed) > 0:
+            print(self._cols.getOrange() + self._cols.getBold() + "[WARNING] " + self._cols.getEnd() +
+                  "Evaluation failed for: " + ", ".join(failed) + ".")
+        print()
+
+    def displayMultiHorizonResults(self, labelNames, mae, rmse):
+        """ This methods displays the model results obtained for every forecast horizon of the selected stock symbol."""
+
+        print("-------------------------------------Multi-Horizon Results---------------------------------------")
+        print(self._cols.getBold() + self._cols.getPurple() +
+              "[ALERT]" + self._cols.getEnd() + " Displaying...")
+        print("Model: " + self.modeSelection(6))
+        for name, horizonMAE, horizonRMSE in zip(labelNames, mae, rmse):
+            print(self._cols.getBold() + name + self._cols.getEnd() + " - Mean Absolute Error: " +
+                  "{:.6f}".format(horizonMAE) + " | Root Mean Squared Error: " + "{:.6f}".format(horizonRMSE))
+        print()
+
     def reportManagement(self, fName, lName, accessLevel):
         """This methods is responsible for report management properties of the user within the system, and constrains the view according to the access level of the user."""
 
@@ -0,0 +1,73 @@
+""" This module is responsible for building the forward looking response variables (labels) used by the machine learning models."""
+from __future__ import annotations
+from abc import ABC, abstractmethod
+import numpy as np
+import pandas as pd
+# --------------------------------------------------------------------------------------------------
+
+
+class Labeller(ABC):
+    """ Labeller interface for creating the response variables of the stock portfolio."""
+
+    @abstractmethod
+    def createLabels(self, stockPort) -> pd.DataFrame:
+        pass
+
+    @abstractmethod
+    def labelNames(self) -> list:
+        pass
+
+    @abstractmethod
+    def horizons(self) -> list:
+        pass
+
+
+class ForwardLabeller(Labeller):
+    """ Builds the forward return or forward price targets for several horizons in one vectorised pass over the portfolio,
+    so that all horizons can be fitted by a single multi-output model."""
+
+    def __init__(self, horizons=(1, 5, 21), kind="return", priceColumn="Adj Close"):
+
+        if kind not in ("return", "price"):
+            raise ValueError("Label kind must be either 'return' or 'price'.")
+
+        self._horizons = np.asarray(sorted(set(int(h) for h in horizons)))
+        self._kind = kind
+        self._priceColumn = priceColumn
+
+    def labelNames(self) -> list:
+        """ Returns the column names of the labels in order of increasing horizon."""
+
+        prefix = "FWD_RETURN_" if self._kind == "return" else "FWD_PRICE_"
+
+        return [prefix + str(horizon) + "D" for horizon in self._horizons]
+
+    def horizons(self) -> list:
+        """ Returns the horizons in days, in the order of the label columns."""
+
+        return self._horizons.tolist()
+
+    def createLabels(self, stockPort) -> pd.DataFrame:
+        """ Returns a frame holding one column per horizon, aligned on the index of the portfolio.
+        Rows whose horizon reaches past the end of the stock's price series are left as NaN."""
+
+        # Rows of each stock are stored contiguously in date order by the processor
+        prices = stockPort.loc[:, self._priceColumn].to_numpy(dtype=float)
+        stocks = stockPort.loc[:, "STOCK-NAME"].to_numpy()
+        rows = len(prices)
+
+        # (rows x horizons) matrix of the row holding the future price for every horizon
+        future = np.arange(rows)[:, None] + self._horizons[None, :]
+        valid = future < rows
+        future = np.minimum(future, rows - 1)
+        # a horizon must not cross into the next stock in the portfolio
+        valid &= stocks[future] == stocks[:, None]
+
+        futurePrices = np.where(valid, prices[future], np.nan)
+
+        if self._kind == "return":
+            labels = futurePrices / prices[:, None] - 1
+        else:
+            labels = futurePrices
+
+        return pd.DataFrame(labels, index=stockPort.index, columns=self.labelNames())
@@ -15,6 +15,8 @@ def main():
     1. Random Forest - PSO.
     2. Random Forest.
     3. Adapted Random Forest.
+    Each model can also be evaluated across every symbol of the portfolio at once,
+    and the Random Forest on forecasts of several horizons at once.
     As well as view the evaluation report of all calculations."""
 
     while True:
@@ -59,9 +61,9 @@ def main():
             xTrain, yTrain, xTest, yTest, targetVARS, exploratoryTraining, exploratoryTesting = controller.orchastrateProcessing(
                 sList, correctSymb, startPeriod, endPeriod, confirm)  # loading train and test data.
 
-            # Machine learning module
+            # Machine learning module, the final model is saved under its ticker
             mae, rmse = controller.orchastrateEvaluation(
-                xTrain, yTrain, xTest, yTest, confirm, targetVARS, exploratoryTraining, exploratoryTesting)  # evaluating classifier
+                xTrain, yTrain, xTest, yTest, confirm, targetVARS, exploratoryTraining, exploratoryTesting, sList[correctSymb])  # evaluating classifier
 
             # Report creation and management
             controller.orchastrateReportProcessing(correctSymb, sList, name,
@@ -72,9 +74,9 @@ def main():
             xTrain, yTrain, xTest, yTest, targetVARS, exploratoryTraining, exploratoryTesting = controller.orchastrateProcessing(
                 sList, correctSymb, startPeriod, endPeriod, confirm)
 
-            # Machine learning module
+            # Machine learning module, the out-of-fold predictions are saved under its ticker
             mae, rmse = controller.orchastrateEvaluation(
-                xTrain, yTrain, xTest, yTest, confirm, targetVARS, exploratoryTraining, exploratoryTesting)
+                xTrain, yTrain, xTest, yTest, confirm, targetVARS, exploratoryTraining, exploratoryTesting, sList[correctSymb])
 
             # Report creation and management
             controller.orchastrateReportProcessing(correctSymb, sList, name,
@@ -86,9 +88,9 @@ def main():
             xTrain, yTrain, xTest, yTest, targetVARS, exploratoryTraining, exploratoryTesting = controller.orchastrateProcessing(
                 sList, correctSymb, startPeriod, endPeriod, confirm)
 
-            # Machine learning module
+            # Machine learning module, the out-of-fold predictions are saved under its ticker
             mae, rmse = controller.orchastrateEvaluation(
-                xTrain, yTrain, xTest, yTest, confirm, targetVARS, exploratoryTraining, exploratoryTesting)
+                xTrain, yTrain, xTest, yTest, confirm, targetVARS, exploratoryTraining, exploratoryTesting, sList[correctSymb])
 
             # Report creation and management
             controller.orchastrateReportProcessing(correctSymb, sList, name,
@@ -102,6 +104,18 @@ def main():
             if quitIS == 1:  # user wants to go back to main program at this point
                 main()
 
+        elif confirm == 5:
+
+            # Every symbol is processed and evaluated in parallel with a summary table of the results
+            controller.orchastratePortfolioEvaluation(
+                sList, startPeriod, endPeriod)
+
+        elif confirm == 6:
+
+            # Forward labels of every horizon evaluated by a single multi-output random forest
+            controller.orchastrateMultiHorizon(
+                sList, correctSymb, startPeriod, endPeriod)
+
 
 if __name__ == "__main__":
 
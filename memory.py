@@ -0,0 +1,180 @@
+""" This module is responsible for bounding the memory used by fitted forests and for measuring their footprint."""
+
+from __future__ import annotations
+import os
+import pickle
+import threading
+
+try:
+    _pageSize = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):  # sysconf is only available on unix
+    _pageSize = None
+
+
+def treeFootprint(model) -> int:
+    """ Returns the number of bytes held by the node and value arrays of the trees of a fitted forest,
+    None for any other estimator. Reading the arrays costs next to nothing, so every fitted fold is measured."""
+
+    estimators = getattr(model, "estimators_", None)
+    if isinstance(estimators, list) and estimators and all(hasattr(tree, "tree_") for tree in estimators):
+        # the state of a tree is its node array and the value array of every node
+        return int(sum(state["nodes"].nbytes + state["values"].nbytes
+                       for state in (tree.tree_.__getstate__() for tree in estimators)))
+
+    return None
+
+
+def modelFootprint(model) -> int:
+    """ Returns the number of bytes held by a fitted model.
+    The trees of a forest are counted directly, any other estimator is measured by its pickled size."""
+
+    footprint = treeFootprint(model)
+    if footprint is not None:
+        return footprint
+
+    return len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def currentRSS() -> int:
+    """ Returns the resident set size of the current process in bytes, or None where it cannot be measured."""
+
+    if _pageSize is None:
+        return None
+
+    try:
+        with open("/proc/self/statm") as statm:
+            # the second field is the number of resident pages
+            return int(statm.read().split()[1]) * _pageSize
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class PeakMemory:
+
+    """ Measures the largest growth of the resident set size of the process while a block of code runs.
+
+    A helper thread samples the resident set size every interval seconds, so a peak shorter than the interval
+    may be missed. The growth is None where the resident set size cannot be measured."""
+
+    def __init__(self, interval=0.01):
+        self._interval = interval
+        self.growth = None
+
+    def __enter__(self):
+
+        self._baseline = currentRSS()
+        self._peak = self._baseline
+        self._stopped = threading.Event()
+        self._thread = None
+
+        if self._baseline is not None:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+
+        return self
+
+    def _sample(self):
+
+        while not self._stopped.wait(self._interval):
+            self._peak = max(self._peak, currentRSS() or 0)
+
+    def __exit__(self, *exc):
+
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._peak = max(self._peak, currentRSS() or 0)
+            self.growth = self._peak - self._baseline
+
+        return False
+
+
+def formatBytes(size) -> str:
+    """ Returns a size in bytes as a human readable string."""
+
+    if size is None:
+        return "n/a"
+
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return "{:.1f} {}".format(size, unit)
+        size /= 1024
+
+    return "{:.1f} GB".format(size)
+
+
+def _sameKind(value, cap) -> bool:
+    """ Returns whether a hyperparameter and its cap are both numbers of rows or both fractions of the rows."""
+
+    return value is not None and isinstance(value, float) == isinstance(cap, float)
+
+
+class MemoryBudget:
+
+    """ Caps on the growth of every tree so that more forests fit in memory at once.
+
+    The size of a fully grown tree grows with the number of training rows, one leaf per few rows.
+    Limiting the depth, the rows per leaf and the rows drawn for each tree bounds the node count of every tree,
+    usually at a small cost in accuracy. None leaves a parameter at its default."""
+
+    def __init__(self, maxDepth=None, minSamplesLeaf=None, maxSamples=None):
+
+        if maxDepth is not None and int(maxDepth) < 1:
+            raise ValueError("maxDepth must be a positive integer.")
+        if minSamplesLeaf is not None and not (minSamplesLeaf >= 1 or 0 < minSamplesLeaf < 0.5):
+            raise ValueError(
+                "minSamplesLeaf must be at least 1 row or a fraction below 0.5.")
+        if maxSamples is not None and not (maxSamples >= 1 or 0 < maxSamples <= 1):
+            raise ValueError(
+                "maxSamples must be a number of rows or a fraction in (0, 1].")
+
+        self.maxDepth = maxDepth
+        self.minSamplesLeaf = minSamplesLeaf
+        self.maxSamples = maxSamples
+
+    @classmethod
+    def bounded(cls) -> MemoryBudget:
+        """ Returns the caps of the memory-bounded training mode."""
+
+        return cls(maxDepth=16, minSamplesLeaf=5, maxSamples=0.5)
+
+    def params(self) -> dict:
+        """ Returns the capped hyperparameters, in the names used by the estimator backends."""
+
+        caps = {"max_depth": self.maxDepth,
+                "min_samples_leaf": self.minSamplesLeaf,
+                "max_samples": self.maxSamples}
+
+        return {name: value for name, value in caps.items() if value is not None}
+
+    def cap(self, params) -> dict:
+        """ Returns the hyperparameters with the caps applied: the depth and the rows drawn for each tree are at most,
+        and the rows per leaf at least, those of the budget. A searched value only replaces a cap of the same kind,
+        a number of rows (int) or a fraction of the rows (float), the cap is kept when the two cannot be compared."""
+
+        capped = dict(params)
+
+        if self.maxDepth is not None:
+            # None grows trees fully
+            depth = capped.get("max_depth")
+            capped["max_depth"] = self.maxDepth if depth is None else min(depth, self.maxDepth)
+
+        if self.minSamplesLeaf is not None:
+            leaf = capped.get("min_samples_leaf")
+            capped["min_samples_leaf"] = max(leaf, self.minSamplesLeaf) \
+                if _sameKind(leaf, self.minSamplesLeaf) else self.minSamplesLeaf
+
+        if self.maxSamples is not None:
+            # None draws every row
+            samples = capped.get("max_samples")
+            capped["max_samples"] = min(samples, self.maxSamples) \
+                if _sameKind(samples, self.maxSamples) else self.maxSamples
+
+        return capped
+
+    def key(self) -> tuple:
+        return tuple(sorted(self.params().items()))
+
+    def __repr__(self):
+        return "MemoryBudget(maxDepth={!r}, minSamplesLeaf={!r}, maxSamples={!r})".format(
+            self.maxDepth, self.minSamplesLeaf, self.maxSamples)
@@ -0,0 +1,121 @@
+""" This module contains the out-of-fold prediction store and the vectorised metrics computed from it after the fits."""
+
+from __future__ import annotations
+import os
+import numpy as np
+
+
+def meanAbsoluteError(actual, predicted) -> np.ndarray:
+    return np.mean(np.abs(predicted - actual), axis=0)
+
+
+def rootMeanSquaredError(actual, predicted) -> np.ndarray:
+    return np.sqrt(np.mean((predicted - actual) ** 2, axis=0))
+
+
+def meanAbsolutePercentageError(actual, predicted) -> np.ndarray:
+    """ Returns the mean absolute error relative to the actual values, only meaningful for prices rather than
+    standardised values. Rows whose actual value is zero are left out."""
+
+    nonZero = actual != 0
+    relative = np.abs(predicted - actual) / np.where(nonZero, np.abs(actual), 1)
+
+    return np.sum(relative * nonZero, axis=0) / np.maximum(np.sum(nonZero, axis=0), 1)
+
+
+def directionalAccuracy(actual, predicted) -> np.ndarray:
+    """ Returns the share of rows whose predicted move from the previous actual value has the sign of the actual move.
+    The rows must be in time order, the first row has no previous value and is left out."""
+
+    actualMove = np.sign(actual[1:] - actual[:-1])
+    predictedMove = np.sign(predicted[1:] - actual[:-1])
+
+    return np.mean(actualMove == predictedMove, axis=0)
+
+
+class OutOfFoldPredictions:
+
+    """ The out-of-fold predictions of one cross validation run, kept as a single set of arrays.
+
+    Every test row of every fold is stored with its row index, fold number, actual and predicted value, so that
+    further metrics are computed from the arrays with no refitting. Single output runs hold one dimensional
+    actual and predicted arrays, multi horizon runs hold one column per horizon."""
+
+    _arrays = ("index", "fold", "actual", "predicted")
+
+    def __init__(self, index, fold, actual, predicted):
+        self.index = index
+        self.fold = fold
+        self.actual = actual
+        self.predicted = predicted
+
+    @classmethod
+    def fromFolds(cls, folds, response) -> OutOfFoldPredictions:
+        """ Concatenates the fold results of the fold executor, in fold order, with the actual values of their test rows."""
+
+        index = np.concatenate([fold["testIndex"] for fold in folds])
+        fold = np.concatenate([np.full(len(result["testIndex"]), number)
+                               for number, result in enumerate(folds)])
+        predicted = np.concatenate([result["predictions"] for result in folds])
+        actual = np.reshape(np.asarray(response)[index], np.shape(predicted))
+
+        return cls(index, fold, actual, predicted)
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def nFolds(self) -> int:
+        return int(self.fold.max()) + 1 if len(self.fold) else 0
+
+    def residuals(self) -> np.ndarray:
+        """ Returns the residual (predicted minus actual) of every out-of-fold row."""
+
+        return self.predicted - self.actual
+
+    def rescale(self, mean, scale) -> OutOfFoldPredictions:
+        """ Returns the predictions converted back from standardised values, e.g. into prices."""
+
+        return OutOfFoldPredictions(self.index, self.fold, self.actual * scale + mean, self.predicted * scale + mean)
+
+    def inTimeOrder(self) -> OutOfFoldPredictions:
+        """ Returns the rows sorted by row index, folds of a shuffled or k-fold split are interleaved again."""
+
+        order = np.argsort(self.index, kind="stable")
+
+        return OutOfFoldPredictions(*(getattr(self, name)[order] for name in self._arrays))
+
+    def score(self, metric):
+        """ Returns the metric over every out-of-fold row at once."""
+
+        return metric(self.actual, self.predicted)
+
+    def periodScores(self, metric, periods=None) -> tuple:
+        """ Returns the labels of every period and the metric of each of them, by default the periods are the folds.
+        Periods are any labels with one entry per row, e.g. the month of each test row."""
+
+        periods = self.fold if periods is None else np.asarray(periods)
+        labels, inverse = np.unique(periods, return_inverse=True)
+
+        return labels, np.array([metric(self.actual[inverse == period], self.predicted[inverse == period])
+                                 for period in range(len(labels))])
+
+    def foldScores(self, metric) -> np.ndarray:
+        """ Returns the metric of every fold, in fold order."""
+
+        return self.periodScores(metric)[1]
+
+    def save(self, path):
+        """ Writes the arrays to a compressed .npz file, creating its directory when needed."""
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        np.savez_compressed(path, **{name: getattr(self, name) for name in self._arrays})
+
+    @classmethod
+    def load(cls, path) -> OutOfFoldPredictions:
+
+        with np.load(path) as arrays:
+            return cls(*(arrays[name] for name in cls._arrays))
@@ -0,0 +1,203 @@
+""" This module is responsible for persisting fitted models, with tree arrays laid out so they can be memory-mapped."""
+
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from datetime import datetime
+import json
+import os
+import re
+import joblib
+import numpy as np
+
+# marker of a leaf in the children arrays of a fitted scikit-learn tree
+_treeLeaf = -1
+
+
+class PackedForest:
+
+    """ A fitted forest of regression trees flattened into five contiguous arrays.
+
+    Every tree is appended to the same children, feature, threshold and value arrays, and the root of each tree is
+    kept in roots. Loaded with memory-mapping, the arrays are shared between processes through the page cache,
+    and prediction walks every tree at once without rebuilding the scikit-learn estimator."""
+
+    _arrays = ("roots", "left", "right", "feature", "threshold", "value")
+
+    def __init__(self, roots, left, right, feature, threshold, value):
+        self.roots = roots
+        self.left = left
+        self.right = right
+        self.feature = feature
+        self.threshold = threshold
+        self.value = value
+
+    @classmethod
+    def isPackable(cls, model) -> bool:
+        """ Returns whether the model is an ensemble of scikit-learn regression trees."""
+
+        estimators = getattr(model, "estimators_", None)
+
+        return isinstance(estimators, list) and len(estimators) > 0 and all(hasattr(tree, "tree_") for tree in estimators)
+
+    @classmethod
+    def fromEstimator(cls, model) -> PackedForest:
+        """ Flattens the trees of a fitted forest, child indices are offset to point into the shared arrays."""
+
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        sizes = np.array([tree.node_count for tree in trees])
+        roots = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+        def offsetChildren(children, root):
+            return np.where(children == _treeLeaf, _treeLeaf, children + root)
+
+        left = np.concatenate([offsetChildren(tree.children_left, root)
+                              for tree, root in zip(trees, roots)])
+        right = np.concatenate([offsetChildren(tree.children_right, root)
+                               for tree, root in zip(trees, roots)])
+        feature = np.concatenate([tree.feature for tree in trees])
+        threshold = np.concatenate([tree.threshold for tree in trees])
+        # regression trees hold one value per output at every node
+        value = np.concatenate([tree.value[:, :, 0] for tree in trees])
+
+        return cls(roots.astype(np.int64), left.astype(np.int64), right.astype(np.int64),
+                   feature.astype(np.int64), threshold.astype(np.float64), value.astype(np.float64))
+
+    def save(self, directory):
+        """ Writes every array as an uncompressed .npy file, the format numpy can memory-map."""
+
+        for name in self._arrays:
+            np.save(os.path.join(directory, name + ".npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, directory, mmap=True) -> PackedForest:
+        """ Loads the arrays of a packed forest, read-only memory-mapped unless mmap is False."""
+
+        mode = "r" if mmap else None
+
+        return cls(*(np.load(os.path.join(directory, name + ".npy"), mmap_mode=mode) for name in cls._arrays))
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(getattr(self, name).nbytes for name in self._arrays))
+
+    def predict(self, exploratory, chunkSize=10000):
+        """ Returns the mean prediction of all trees, identical to the prediction of the original forest."""
+
+        # the forest compares single precision features against double precision thresholds
+        exploratory = np.asarray(exploratory, dtype=np.float32)
+        predictions = [self._predictChunk(exploratory[start:start + chunkSize])
+                       for start in range(0, len(exploratory), chunkSize)]
+        predValues = np.concatenate(predictions) if predictions else np.empty((0, self.value.shape[1]))
+
+        return predValues[:, 0] if self.value.shape[1] == 1 else predValues
+
+    def _predictChunk(self, exploratory):
+
+        rows = np.arange(len(exploratory))[None, :]
+        # (trees x rows) position of every row in every tree, starting at the roots
+        nodes = np.repeat(np.asarray(self.roots)[:, None], len(exploratory), axis=1)
+
+        while True:
+            left = self.left[nodes]
+            internal = left != _treeLeaf
+            if not internal.any():
+                break
+
+            feature = np.where(internal, self.feature[nodes], 0)
+            goLeft = exploratory[rows, feature] <= self.threshold[nodes]
+            nodes = np.where(internal, np.where(
+                goLeft, left, self.right[nodes]), nodes)
+
+        # trees are summed in order before averaging, as the forest does
+        return np.add.reduce(self.value[nodes], axis=0) / len(self.roots)
+
+
+class Store(ABC):
+    """ Store interface for persisting fitted models with their metadata."""
+
+    @abstractmethod
+    def saveModel(self, model, metadata) -> int:
+        pass
+
+    @abstractmethod
+    def loadModel(self, ticker, version=None, mmap=True) -> tuple:
+        pass
+
+    @abstractmethod
+    def listVersions(self, ticker) -> list:
+        pass
+
+
+class ModelStore(Store):
+
+    """ Versioned store of fitted models, one directory per ticker and one sub directory per version.
+
+    Forests of regression trees are saved as a PackedForest so that prediction processes memory-map one shared copy,
+    any other estimator is saved with joblib. Metadata (ticker, selected features, data hash, metrics, ...) is
+    written alongside as JSON."""
+
+    def __init__(self, path="models"):
+        self._path = path
+
+    def _tickerPath(self, ticker):
+        return os.path.join(self._path, str(ticker))
+
+    def _versionPath(self, ticker, version):
+        return os.path.join(self._tickerPath(ticker), "v" + str(version))
+
+    def listVersions(self, ticker):
+        """ Returns the saved versions of the ticker's model in increasing order."""
+
+        tickerPath = self._tickerPath(ticker)
+        if not os.path.isdir(tickerPath):
+            return []
+
+        return sorted(int(match.group(1)) for match in
+                      (re.fullmatch(r"v(\d+)", name) for name in os.listdir(tickerPath)) if match)
+
+    def saveModel(self, model, metadata):
+        """ Saves the fitted model and its metadata as the next version of the ticker and returns the version."""
+
+        ticker = metadata["ticker"]
+        versions = self.listVersions(ticker)
+        version = versions[-1] + 1 if versions else 1
+
+        directory = self._versionPath(ticker, version)
+        os.makedirs(directory)
+
+        if PackedForest.isPackable(model):
+            modelFormat = "packed"
+            PackedForest.fromEstimator(model).save(directory)
+        else:
+            modelFormat = "joblib"
+            joblib.dump(model, os.path.join(directory, "model.joblib"))
+
+        metadata = dict(metadata, version=version, format=modelFormat,
+                        created=datetime.now().isoformat(timespec="seconds"))
+
+        with open(os.path.join(directory, "metadata.json"), "w", encoding="UTF-8") as entry:
+            json.dump(metadata, entry, indent=2)
+
+        return version
+
+    def loadModel(self, ticker, version=None, mmap=True):
+        """ Returns the model and metadata of a version of the ticker, the latest version when none is given.
+        No retraining takes place, packed forests are memory-mapped unless mmap is False."""
+
+        versions = self.listVersions(ticker)
+        if not versions:
+            raise FileNotFoundError("No saved model found for '{}'.".format(ticker))
+
+        version = versions[-1] if version is None else version
+        directory = self._versionPath(ticker, version)
+
+        with open(os.path.join(directory, "metadata.json"), "r", encoding="UTF-8") as entry:
+            metadata = json.load(entry)
+
+        if metadata["format"] == "packed":
+            model = PackedForest.load(directory, mmap)
+        else:
+            model = joblib.load(os.path.join(directory, "model.joblib"),
+                                mmap_mode="r" if mmap else None)
+
+        return model, metadata
@@ -1,147 +1,519 @@
-"""This module is responsible for hyperparameter tuning the 'amount of features' variable on the random forest algorithm."""
+"""This module is responsible for hyperparameter tuning the 'amount of features' variable on the random forest algorithm,
+optionally together with further forest hyperparameters of a multi-dimensional search space."""
 from __future__ import annotations
 from abc import ABC, abstractmethod
-import random
+import math
+import os
+import pickle
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, wait
 import numpy as np
+from joblib import Parallel, delayed
+from joblib.externals.loky import ProcessPoolExecutor
+from cache import hashDataset, writeAtomically
+from classifier import Fidelity
+from executor import allocateCores, resolveCoreBudget
+from searchspace import SearchSpace
 # ----------------------------------------------------------------------------
 
 
-class ParticleHelper:  # BASE CLASS
+def _particleFitness(forest, xTrain, yTrain, particle, incumbent, fidelity, coreBudget):
+    """ Evaluates one position with a copy of the classifier in a worker process, within a share of the core budget.
+    Returns the fitness and whether it is exact, a race abandoned against the incumbent only returns a bound."""
 
-    """Particle helper class which manages all the particles within the swarm."""
+    forest.setCoreBudget(coreBudget)
+    fitness = forest.calculateFitnessPSO(
+        particle, xTrain, yTrain, incumbent, fidelity)
 
-    # Private variables
+    return fitness, forest.cachedFitness(particle, xTrain, yTrain, fidelity) is not None
 
-    # acceleration co-efficient on the velocity update equation
-    __accelerationCoeff1 = float(1.496180)
-    # acceleration co-efficient on the position update equation
-    __accelerationCoeff2 = float(1.496180)
-    # inertia weight to prevent velocities becoming too large
-    __inertiaWeight = float(0.729844)
+
+class StoppingCriteria:
+
+    """ Budgets and convergence tests which end an optimisation, the first one met stops it.
+
+    maxGenerations and maxEvaluations bound the work, timeLimit bounds the wall-clock seconds of a run, patience
+    stops after that many generations without a new global best and diameter stops once every particle lies
+    within that distance of every other, measured as a share of the range of each dimension.
+    None switches a criterion off, the generation budget always applies.
+
+    maxEvaluations is a hard limit on the fitness values computed: a generation which would exceed it
+    only evaluates the particles which fit within the remaining budget. A small search space is only evaluated
+    exhaustively when the budget covers every point and no time limit is set, a forced exhaustive search
+    evaluates it a generation at a time and stops on either budget like any other search."""
+
+    def __init__(self, maxGenerations=3, patience=None, diameter=None, maxEvaluations=None, timeLimit=None):
+
+        if int(maxGenerations) < 1:
+            raise ValueError("maxGenerations must be a positive integer.")
+        if maxEvaluations is not None and int(maxEvaluations) < 1:
+            raise ValueError("maxEvaluations must be a positive integer.")
+
+        self.maxGenerations = int(maxGenerations)
+        self.patience = patience
+        self.diameter = diameter
+        self.maxEvaluations = maxEvaluations
+        self.timeLimit = timeLimit
+
+    def reason(self, generations, stalled, diameter, evaluations, elapsed):
+        """ Returns why the optimisation stops after the given progress, None while it continues."""
+
+        if generations >= self.maxGenerations:
+            return "generation budget of {} reached".format(self.maxGenerations)
+        if self.maxEvaluations is not None and evaluations >= self.maxEvaluations:
+            return "evaluation budget of {} reached".format(self.maxEvaluations)
+        if self.timeLimit is not None and elapsed >= self.timeLimit:
+            return "time limit of {}s reached".format(self.timeLimit)
+        if self.patience is not None and stalled >= self.patience:
+            return "global best unchanged for {} generations".format(stalled)
+        if self.diameter is not None and diameter < self.diameter:
+            return "swarm diameter {:.4f} below {}".format(diameter, self.diameter)
+
+        return None
+
+    def __repr__(self):
+        return "StoppingCriteria(maxGenerations={!r}, patience={!r}, diameter={!r}, maxEvaluations={!r}, timeLimit={!r})".format(
+            self.maxGenerations, self.patience, self.diameter, self.maxEvaluations, self.timeLimit)
+
+
+class SearchHelper:  # BASE CLASS
+
+    """ Machinery shared by every optimiser: points of the search space are evaluated through the fitness cache of the
+    classifier, in parallel within the core budget and within the evaluation budget of the stopping criteria,
+    and every run is recorded in the telemetry."""
 
     # Protected variables
 
-    _sizeOfSwarm = int(30)  # Size of the population (particles in the swarm)
+    _sizeOfSwarm = int(30)  # Size of the population (points evaluated per generation)
     _maximumGeneration = int(3)  # Maximum number of iterations
     # initial number of derived and base indicators
     _dimensionOfProblem = int(12)
+    # points per dimension of a multi-dimensional search space
+    _particlesPerDimension = int(10)
+    # search spaces no larger than the evaluations of one generation are searched exhaustively
+    _exhaustiveLimit = _sizeOfSwarm
+
+    def __init__(self, forest, seed=None, coreBudget=None, searchSpace=None, exhaustive=None, stopping=None, telemetry=None):
+        """ Initialises the state shared by every optimiser. All state belongs to the instance, including its
+        random number generator, so that several optimisations can run at once in threads or processes without interfering."""
 
-    # Arrays
+        self._classifier = forest
+        # hyperparameters searched, the amount of features alone by default
+        self.searchSpace = searchSpace or SearchSpace.featureSpace(
+            self._dimensionOfProblem)
+        # points evaluated per generation, larger spaces need more of them to be covered
+        self.swarmSize = self._sizeOfSwarm if len(self.searchSpace) == 1 else max(
+            self._sizeOfSwarm, self._particlesPerDimension * len(self.searchSpace))
+        # random draws of this optimiser only, reproducible when a seed is given
+        self._rng = np.random.default_rng(seed)
+        # distinct positions of a generation are evaluated in parallel within this budget
+        self._coreBudget = resolveCoreBudget(coreBudget)
+        # budgets and convergence tests ending a run, three generations by default
+        self._stopping = stopping or StoppingCriteria(self._maximumGeneration)
+        # fitness values asked for and fitness evaluations computed (not recalled from the cache) during the latest optimisation
+        self.requested = 0
+        self.evaluations = 0
+        # hard limit on the evaluations of the current run, None leaves them unbounded
+        self._evaluationLimit = None
+        # sink of the structured records of every run, None keeps no records
+        self.telemetry = telemetry
+        # id of the latest run in the telemetry and the best fitness of each of its generations
+        self.run = None
+        self.trajectory = []
+        # best solutions found during the latest optimisation, the last one is the result
+        self.candidateTotal = []
+        # why the latest optimisation stopped
+        self.stopReason = None
+        # True always evaluates every point, False always runs the search, None decides by the size of the search space
+        self._exhaustive = exhaustive
+        # fitness of every point of the latest exhaustive search
+        self.fitnessCurve = {}
+
+    def positionDiversity(self, positions) -> tuple:
+        """ Returns the largest distance between two positions and the mean distance of the positions from their centre,
+        both measured as a share of the range of every dimension."""
+
+        if len(positions) == 0:
+            return 0.0, 0.0
+
+        span = np.where(self.searchSpace.upper > self.searchSpace.lower,
+                        self.searchSpace.upper - self.searchSpace.lower, 1)
+        scaled = self.searchSpace.clip(positions) / span
+
+        diameter = np.sqrt(np.max(np.sum((scaled[:, None] - scaled[None]) ** 2, axis=-1)))
+        spread = np.mean(np.sqrt(np.sum((scaled - scaled.mean(axis=0)) ** 2, axis=-1)))
+
+        return float(diameter), float(spread)
+
+    def _beginTelemetry(self, **fields):
+        """ Starts the clock and the counters of a run and records its settings."""
+
+        self.run = uuid.uuid4().hex[:12]
+        self.trajectory = []
+        self._runStart = self._generationStart = time.perf_counter()
+        self._generationCounts = (self.requested, self.evaluations)
+
+        if self.telemetry is not None:
+            self.telemetry.record("start", run=self.run, optimiser=getattr(self, "name", type(self).__name__),
+                                  searchSpace=repr(self.searchSpace), swarmSize=self.swarmSize, **fields)
+
+    def _recordGeneration(self, generation, bestFitness, best, positions):
+        """ Records the work, wall time, best point and diversity of the positions of one generation."""
+
+        now = time.perf_counter()
+        requested = self.requested - self._generationCounts[0]
+        computed = self.evaluations - self._generationCounts[1]
+        diameter, spread = self.positionDiversity(positions)
+        self.trajectory.append(float(bestFitness))
+
+        if self.telemetry is not None:
+            self.telemetry.record("generation", run=self.run, generation=generation, requested=requested,
+                                  computed=computed, cacheHits=requested - computed,
+                                  hitRatio=(requested - computed) / requested if requested else None,
+                                  seconds=now - self._generationStart, bestFitness=bestFitness, best=best,
+                                  diameter=diameter, meanDistance=spread)
+
+        self._generationStart = now
+        self._generationCounts = (self.requested, self.evaluations)
+
+    def _endTelemetry(self, result):
+        """ Prints where the fitness values of a run came from and records its totals and global best trajectory."""
+
+        hits = self.requested - self.evaluations
+        print(self.evaluations, "of", self.requested, "fitness values computed,",
+              "{:.0%} recalled from the cache.".format(hits / self.requested if self.requested else 0))
+
+        if self.telemetry is not None:
+            self.telemetry.record("finish", run=self.run, stopReason=self.stopReason, generations=len(self.trajectory),
+                                  requested=self.requested, computed=self.evaluations, cacheHits=hits,
+                                  hitRatio=hits / self.requested if self.requested else None,
+                                  seconds=time.perf_counter() - self._runStart, result=result,
+                                  trajectory=self.trajectory)
+
+    def _evaluationsLeft(self):
+        """ Returns how many more fitness values the current run may compute, None when they are not limited."""
+
+        if self._evaluationLimit is None:
+            return None
+
+        return max(0, self._evaluationLimit - self.evaluations)
+
+    def _evaluatePositions(self, xTrain, yTrain, positions, incumbents=None, fidelity=None):
+        """ Returns the fitness of every position, each position may be given the incumbent it has to beat.
+        Every distinct position (after clamping to the search space) is evaluated once and its fitness is
+        broadcast back to the particles (or points) sharing it. Positions which are not memoised yet are evaluated in parallel.
+        Once the evaluation budget runs out, the later positions are not evaluated and their fitness is NaN."""
+
+        clamped = self.searchSpace.clip(np.reshape(
+            np.asarray(positions, dtype=float), (-1, len(self.searchSpace))))
+        distinct, inverse = np.unique(clamped, axis=0, return_inverse=True)
+        inverse = np.ravel(inverse)
+
+        # particles sharing a position race against the loosest of their incumbents,
+        # a personal best left out by the evaluation budget (NaN) is beaten by any fitness
+        if incumbents is None:
+            distinctIncumbents = [None] * len(distinct)
+        else:
+            distinctIncumbents = np.full(len(distinct), -np.inf)
+            np.maximum.at(distinctIncumbents, inverse,
+                          np.nan_to_num(np.asarray(incumbents, dtype=float), nan=np.inf, posinf=np.inf))
+            distinctIncumbents = distinctIncumbents.tolist()
+
+        fitness = np.array([self._classifier.cachedFitness(self.searchSpace.toResult(position), xTrain, yTrain, fidelity)
+                            for position in distinct], dtype=float)
+        pending = np.flatnonzero(np.isnan(fitness))
+        skipped = 0
+
+        left = self._evaluationsLeft()
+        if left is not None and len(pending) > left:
+            # only the positions of the first particles fit within the budget
+            firstParticle = np.full(len(distinct), len(clamped))
+            np.minimum.at(firstParticle, inverse, np.arange(len(clamped)))
+            pending = pending[np.argsort(firstParticle[pending], kind="stable")]
+            skipped = np.count_nonzero(np.isin(inverse, pending[left:]))
+            pending = pending[:left]
+
+        # values recalled from the cache or shared with another particle, the rest are counted where they are evaluated
+        self.requested += len(clamped) - len(pending) - skipped
+
+        if len(pending) > 0:
+            fitness[pending] = self._mapFitness(
+                xTrain, yTrain, distinct[pending], [distinctIncumbents[index] for index in pending], fidelity)
+
+        return fitness[inverse]
+
+    def _workerDispatch(self, xTrain, yTrain, fidelity=None):
+        """ Prepares fitness evaluations in worker processes: the feature ranking is computed once here rather than
+        in every worker. Returns the function collect(particle, result) which memoises the result of a worker in the
+        classifier of this process when it is exact and returns its fitness."""
+
+        self._classifier.featureImp(xTrain, yTrain, None)
+
+        def collect(particle, result):
+            fitness, exact = result
+            if exact:
+                self._classifier.recordFitness(
+                    particle, xTrain, yTrain, fitness, fidelity)
+            return fitness
+
+        return collect
+
+    def _mapFitness(self, xTrain, yTrain, positions, incumbents, fidelity):
+        """ Evaluates positions on a process pool and memoises the exact results in the classifier of this process."""
+
+        workers, coreBudget = allocateCores(self._coreBudget, len(positions))
+
+        if workers == 1:
+            # no process pool is needed for a single worker
+            return [self._evalBFitness(xTrain, yTrain, position, incumbent, fidelity)
+                    for position, incumbent in zip(positions, incumbents)]
+
+        collect = self._workerDispatch(xTrain, yTrain, fidelity)
+
+        particles = [self.searchSpace.toResult(position) for position in positions]
+        self.requested += len(particles)
+        self.evaluations += len(particles)
+        results = Parallel(n_jobs=workers, backend="loky")(
+            delayed(_particleFitness)(self._classifier, xTrain, yTrain, particle, incumbent, fidelity, coreBudget)
+            for particle, incumbent in zip(particles, incumbents))
+
+        return [collect(particle, result) for particle, result in zip(particles, results)]
+
+    def _evalBFitness(self, xTrain, yTrain, particle, incumbent=None, fidelity=None):  # protected helper function
+        """Fitness function for particle in swarm  - [Nested 10-fold cross validation].
+        The incumbent is the fitness the particle has to beat, allowing the classifier to abandon hopeless candidates.
+        The fidelity sets how cheaply the particle is evaluated, full fidelity when omitted."""
+
+        # positions outside the search space are evaluated at its nearest bound, cache keys are built from plain numbers
+        particle = self.searchSpace.toResult(np.atleast_1d(particle))
+        self.requested += 1
+        if self._classifier.cachedFitness(particle, xTrain, yTrain, fidelity) is None:
+            self.evaluations += 1
+
+        # function call from random forest class
+        value = self._classifier.calculateFitnessPSO(
+            particle, xTrain, yTrain, incumbent, fidelity)
 
-    particleVelocity = []
-    particlePosition = []
-    previousBest = []
+        return value
 
-    def __init__(self, number, forest):
-        """ Initialises a swarm of particles subject to the size of the problem, that is
-        the number of features to be reduced."""
+    def searchSpaceSize(self):
+        """ Returns the number of distinct points the optimiser can select, infinite for a continuous dimension."""
 
-        self._classifier = forest
+        return self.searchSpace.size
 
-        if number == 0:  # initialise first particle any amount of features
+    def _describe(self, result) -> str:
+        """ Returns the message announcing the result of an optimisation."""
 
-            numb = list(random.sample(
-                range(1, self._dimensionOfProblem-1), 1))
-            numero = numb[-1]
+        if isinstance(result, dict):
+            return "Optimal hyperparameters for classifier are {}".format(result)
 
-            # Randomly initialise population between 0-12 (12 being n_features)
-            self.particlePosition = numero
+        return "Optimal feature for classifier is {}".format(result)
 
-            # Randomly initialise velocity with 0.01 as maximum velocity constraint
-            self.particleVelocity = (
-                0.01 * numero)
+    def _requiresSearch(self) -> bool:
+        """ Returns whether the settings of the optimiser only apply to a search: an evaluation budget too small
+        for every point of the search space or a time limit."""
 
-            # Set the current best as the latest particle
-            self.previousBest = self.particlePosition
+        maxEvaluations = self._stopping.maxEvaluations
 
-        elif number == 1:  # small amount of features (small initialisation)
+        return (maxEvaluations is not None and maxEvaluations < self.searchSpaceSize()) or self._stopping.timeLimit is not None
 
-            numb = list(random.sample(
-                range(1, self._dimensionOfProblem-8), 1))
-            numero = numb[-1]
+    def _searchesExhaustively(self) -> bool:
+        """ Returns whether every point of the search space is evaluated instead of searching it."""
 
-            # Randomly initialise population between 0-12 (12 being n_features)
-            self.particlePosition = numero
+        if self._exhaustive is None:
+            return self.searchSpaceSize() <= self._exhaustiveLimit and not self._requiresSearch()
 
-            # Randomly initialise velocity with 0.01 as maximum velocity constraint
-            self.particleVelocity = (
-                0.01 * numero)
+        return self._exhaustive
 
-            # Set the current best as the latest particle
-            self.previousBest = self.particlePosition
+    def _exhaustiveOptimum(self, xTrain, yTrain):
+        """ Searches the space exhaustively, announces and returns the optimum."""
 
-        elif number == 2:  # medium sized initialisation
+        self.requested = 0
+        self.evaluations = 0
+        self._evaluationLimit = self._stopping.maxEvaluations
+        self.stopReason = None
+        self._beginTelemetry(mode="exhaustive", stopping=repr(self._stopping))
+        self.candidateTotal = [self.exhaustiveSearch(xTrain, yTrain)]
+        print(self._describe(self.candidateTotal[-1]))
 
-            numb = list(random.sample(
-                range(5, self._dimensionOfProblem-4), 1))
-            numero = numb[-1]
+        self._recordGeneration(1, min(self.fitnessCurve.values()), self.candidateTotal[-1], self.searchSpace.grid())
+        self._endTelemetry(self.candidateTotal[-1])
 
-            # Randomly initialise population between 0-12 (12 being n_features)
-            self.particlePosition = numero
+        return self.candidateTotal[-1]
 
-            # Randomly initialise velocity with 0.001 as maximum velocity constraint
-            self.particleVelocity = (
-                0.01 * numero)
+    def exhaustiveSearch(self, xTrain, yTrain):
+        """ Evaluates every point of the search space once, a generation of points at a time in parallel, and returns
+        the exact optimum. Ties are broken towards fewer features. The fitness curve is kept in fitnessCurve,
+        keyed by the amount of features or by the tuple of hyperparameters of each point.
+        The evaluation budget and time limit of the stopping criteria end the search early,
+        the optimum is then the best of the points evaluated so far."""
 
-            # Set the current best as the latest particle
-            self.previousBest = self.particlePosition
+        print("Evaluating all", self.searchSpaceSize(), "points of the search space...")
 
-        elif number == 3:  # large initialisation
+        positions = self.searchSpace.grid()
+        fitness = np.full(len(positions), np.nan)
+        start = time.perf_counter()
 
-            numb = list(random.sample(range(9, self._dimensionOfProblem), 1))
-            numero = numb[-1]
+        for first in range(0, len(positions), self.swarmSize):
+            fitness[first:first + self.swarmSize] = self._evaluatePositions(
+                xTrain, yTrain, positions[first:first + self.swarmSize])
 
-            # Randomly initialise population between 0-12 (12 being n_features)
-            self.particlePosition = numero
+            if first + self.swarmSize >= len(positions) and not np.any(np.isnan(fitness)):
+                self.stopReason = "every point of the search space evaluated"
+            else:
+                self.stopReason = self._stopping.reason(
+                    0, 0, math.inf, self.evaluations, time.perf_counter() - start)
+            if self.stopReason is not None:
+                break
 
-            # Randomly initialise velocity with 0.001 as maximum velocity constraint
-            self.particleVelocity = (
-                0.01 * numero)
+        # points left out by the evaluation budget (NaN) are not part of the curve
+        evaluated = np.flatnonzero(~np.isnan(fitness))
+        results = [self.searchSpace.toResult(position) for position in positions[evaluated]]
+        self.fitnessCurve = {result if not isinstance(result, dict) else tuple(result.values()): value
+                             for result, value in zip(results, fitness[evaluated].tolist())}
 
-            # Set the current best as the latest particle
-            self.previousBest = self.particlePosition
+        for result, value in zip(results, fitness[evaluated].tolist()):
+            if isinstance(result, dict):
+                print("  {}  fitness = {:.6f}".format(result, value))
+            else:
+                print("  features = {:>2}  fitness = {:.6f}".format(result, value))
 
-    def updateParticle(self, globalBest):
-        """ Updates each particle contained within a swarm according to the amount of features contained in the raw feature set.
-        Particle velocity is used to control the rate at which convergence of particles occurs.
-        Particle position is the region within the search space the particle is located in."""
+        # the grid is in lexicographic order, argmin returns the first, i.e. smallest, of equally fit amounts of features
+        return results[int(np.argmin(fitness[evaluated]))]
+
+
+class ParticleHelper(SearchHelper):
+
+    """Particle helper class which manages all the particles within the swarm."""
+
+    # Private variables
+
+    # acceleration co-efficient on the velocity update equation
+    __accelerationCoeff1 = float(1.496180)
+    # acceleration co-efficient on the position update equation
+    __accelerationCoeff2 = float(1.496180)
+    # inertia weight to prevent velocities becoming too large
+    __inertiaWeight = float(0.729844)
+
+    # Protected variables
+
+    # lower (inclusive) and upper (exclusive) bound of the initial positions of every initialisation scheme:
+    # 0 - any amount of features, 1 - small, 2 - medium and 3 - large amount of features
+    _initialisationRanges = {0: (1, SearchHelper._dimensionOfProblem - 1),
+                             1: (1, SearchHelper._dimensionOfProblem - 8),
+                             2: (5, SearchHelper._dimensionOfProblem - 4),
+                             3: (9, SearchHelper._dimensionOfProblem)}
+
+    def __init__(self, number, forest, seed=None, coreBudget=None, searchSpace=None, exhaustive=None, telemetry=None,
+                 stopping=None):
+        """ Initialises the state of a swarm of particles subject to the size of the problem, that is
+        the number of features to be reduced. Positions, velocities and personal bests are held as arrays
+        with one row per particle and one column per dimension of the search space."""
+
+        SearchHelper.__init__(self, forest, seed, coreBudget, searchSpace, exhaustive, stopping, telemetry)
+
+        # initialisation scheme of the swarm, 0 mixes small, medium and large initialisations
+        self._initialisation = number
+
+        self.releaseSwarm()
+
+    def releaseSwarm(self):
+        """ Empties the arrays of the swarm, releasing the state of a finished optimisation."""
+
+        dimensions = len(self.searchSpace)
+        self.particlePosition = np.empty((0, dimensions))
+        self.particleVelocity = np.empty((0, dimensions))
+        self.previousBest = np.empty((0, dimensions))
+        self.previousFitness = np.empty(0)
+
+    def initialiseSwarm(self):
+        """ Randomly initialises the position of every particle within the range of its initialisation scheme.
+        In a mixed initialisation the first third of the particles is small, the next third medium and the rest large.
+        The schemes apply to the amount of features, further dimensions are drawn uniformly from their bounds."""
+
+        particles = np.arange(self.swarmSize)
+
+        if self._initialisation == 0:
+            schemes = 1 + (3 * particles) // self.swarmSize
+        else:
+            schemes = np.full(self.swarmSize, self._initialisation)
 
-        # velocities constrained within a uniform distribution
-        velocity1 = np.random.uniform(0, 1)
-        velocity2 = np.random.uniform(0, 1)
+        lower, upper = np.array(
+            [self._initialisationRanges[scheme] for scheme in schemes]).T
+
+        if len(self.searchSpace) == 1:
+            self.particlePosition = np.empty((self.swarmSize, 1))
+        else:
+            self.particlePosition = self.searchSpace.sample(
+                self._rng, self.swarmSize)
+
+        # Randomly initialise population between 0-12 (12 being n_features), one draw for the whole swarm
+        self.particlePosition[:, 0] = self._rng.integers(lower, upper)
+
+        # Randomly initialise velocity with 0.01 as maximum velocity constraint
+        self.particleVelocity = 0.01 * self.particlePosition
+
+        # Set the current best as the latest particle
+        self.previousBest = self.particlePosition.copy()
+        self.previousFitness = np.full(self.swarmSize, np.inf)
+
+    def updateParticles(self, globalBest, particles=None):
+        """ Updates every particle of the swarm in one step according to the amount of features contained in the raw feature set.
+        Particle velocity is used to control the rate at which convergence of particles occurs, it is limited to
+        a share of the range of every dimension. Particle position is the region within the search space the particle is located in.
+        Only the given particles are moved when particles (indices into the swarm) is passed."""
+
+        rows = slice(None) if particles is None else particles
+        position = self.particlePosition[rows]
+
+        # velocities constrained within a uniform distribution, two draws per particle and dimension
+        velocity1, velocity2 = self._rng.uniform(
+            0, 1, (2,) + position.shape)
 
         # velocity update equation
-        self.particleVelocity = (self.__inertiaWeight * self.particleVelocity) + (self.__accelerationCoeff1 * velocity1 * (globalBest - self.particlePosition)) \
+        velocity = (self.__inertiaWeight * self.particleVelocity[rows]) + (self.__accelerationCoeff1 * velocity1 * (globalBest - position)) \
             + (self.__accelerationCoeff2 * velocity2 *
-               (self.previousBest - self.particlePosition))
+               (self.previousBest[rows] - position))
+        self.particleVelocity[rows] = self.searchSpace.clipVelocity(velocity)
 
-        # position update equation
-        self.particlePosition = round(
-            (self.particlePosition + self.particleVelocity))
+        # position update equation, integer dimensions are rounded and clamped to the space when evaluated
+        position = position + self.particleVelocity[rows]
+        self.particlePosition[rows] = np.where(
+            self.searchSpace.integer, np.round(position), position)
 
-    def _evalBFitness(self, xTrain, yTrain, particle):  # protected helper function
-        """Fitness function for particle in swarm  - [Nested 10-fold cross validation]. """
+    def swarmState(self) -> dict:
+        """ Returns copies of the arrays of the swarm, the state of its random number generator and its evaluation count."""
 
-        if particle > 12:
+        return {"particlePosition": self.particlePosition.copy(),
+                "particleVelocity": self.particleVelocity.copy(),
+                "previousBest": self.previousBest.copy(),
+                "previousFitness": self.previousFitness.copy(),
+                "rng": self._rng.bit_generator.state,
+                "requested": self.requested,
+                "evaluations": self.evaluations}
 
-            particle = 12
+    def restoreSwarm(self, state):
+        """ Restores a swarm saved by swarmState, later random draws repeat those of the saved swarm."""
 
-            # function call from random forest class
-            value = self._classifier.calculateFitnessPSO(
-                particle, xTrain, yTrain)
+        self.particlePosition = state["particlePosition"].copy()
+        self.particleVelocity = state["particleVelocity"].copy()
+        self.previousBest = state["previousBest"].copy()
+        self.previousFitness = state["previousFitness"].copy()
+        self._rng.bit_generator.state = state["rng"]
+        self.requested = state["requested"]
+        self.evaluations = state["evaluations"]
 
-        elif particle < 0:
-            particle = 1
-            # function call from random forest class
-            value = self._classifier.calculateFitnessPSO(
-                particle, xTrain, yTrain)
+    def swarmDiversity(self, positions=None) -> tuple:
+        """ Returns the largest distance between two particles and the mean distance of the particles from their centre,
+        both measured as a share of the range of every dimension. Any set of positions may be measured instead of the swarm."""
 
-        else:
-            # function call from random forest class
-            value = self._classifier.calculateFitnessPSO(
-                particle, xTrain, yTrain)
+        return self.positionDiversity(self.particlePosition if positions is None else positions)
 
-        return value
+    def swarmDiameter(self) -> float:
+        """ Returns the largest distance between two particles, measured as a share of the range of every dimension."""
+
+        return self.swarmDiversity()[0]
 
 
 class Optimiser(ABC):
@@ -151,95 +523,383 @@ class Optimiser(ABC):
     def metaOpt(self, xTrain, yTrain, forest):
         pass
 
+    @abstractmethod
+    def searchSpaceSize(self) -> int:
+        pass
+
+    @abstractmethod
+    def exhaustiveSearch(self, xTrain, yTrain) -> int:
+        pass
+
 
 class Heuristic(ParticleHelper, Optimiser):  # DERIVED CLASS
 
     """ Derived class for particle optimisation. """
 
-    # Initialisation of arrays
-    swarmOfParticles = []
-    candidateTotal = []
+    name = "pso"
 
-    def __init__(self, number, forest):
+    # factor by which each successive halving rung cuts the cost of an evaluation
+    _eta = int(3)
+
+    def __init__(self, number, forest, multiFidelity=False, seed=None, coreBudget=None, exhaustive=None, searchSpace=None,
+                 stopping=None, checkpoint=None, checkpointInterval=1, asynchronous=False, telemetry=None):
 
         # constructor of super class
-        ParticleHelper.__init__(self, number, forest)
+        ParticleHelper.__init__(self, number, forest, seed, coreBudget, searchSpace, exhaustive, telemetry, stopping)
 
-    def metaOpt(self, xTrain, yTrain, forest):
-        """ Metaheuristic algorithm for hyperparameter tuning. """
+        # screen the swarm with cheap evaluations and keep full fidelity for the final candidates
+        self._multiFidelity = multiFidelity
+        # file the swarm is saved to every checkpointInterval generations and resumed from, None never saves it
+        self._checkpoint = checkpoint
+        self._checkpointInterval = max(1, int(checkpointInterval))
 
-        print("Initialising Swarm...")
+        # steady state swarm: every particle moves as soon as its own evaluation returns, with no generation barrier
+        if asynchronous and (multiFidelity or checkpoint is not None):
+            raise ValueError(
+                "The asynchronous swarm has no generations to raise the fidelity or checkpoint at.")
+        self._asynchronous = asynchronous
 
-        for i in range(0, self._sizeOfSwarm):  # mixed initialisation
+        if exhaustive and (multiFidelity or checkpoint is not None or asynchronous):
+            raise ValueError(
+                "An exhaustive search has no swarm to screen at low fidelity, checkpoint or run asynchronously.")
 
-            if i < (self._sizeOfSwarm-20):  # small init
+    def _requiresSearch(self) -> bool:
+        """ Returns whether the settings of the swarm only apply to a search, the settings of the swarm itself included."""
 
-                number = 1
-                # instantiating particle helper class with inbuilt initialiser
-                self.swarmOfParticles.append(
-                    Heuristic(number, forest))
+        return ParticleHelper._requiresSearch(self) or self._multiFidelity or self._checkpoint is not None \
+            or self._asynchronous
 
-            elif i > (self._sizeOfSwarm-21) and i < (self._sizeOfSwarm-10):  # medium init
+    def _checkpointSignature(self, xTrain, yTrain) -> tuple:
+        """ Returns what a checkpoint must match to be resumed: the data, the search space, the settings of the
+        classifier (backend, fitness mode, feature ranking and the caps of the memory budget), the swarm,
+        its fidelity schedule and its stopping criteria."""
 
-                number = 2
-                # instantiating particle helper class with inbuilt initialiser
-                self.swarmOfParticles.append(
-                    Heuristic(number, forest))
+        return (hashDataset(xTrain, yTrain), repr(self.searchSpace), self._classifier.configuration(), self.swarmSize,
+                self._initialisation, self._multiFidelity, self._eta, repr(self._stopping))
 
-            else:  # large init
-                number = 3
+    def _runState(self, signature, stalled, generation, elapsed) -> dict:
+        """ Returns the state a run is resumed from at the start of a generation."""
 
-                # instantiating particle helper class with inbuilt initialiser
-                self.swarmOfParticles.append(
-                    Heuristic(number, forest))
+        return dict(self.swarmState(), signature=signature, candidateTotal=list(self.candidateTotal),
+                    trajectory=list(self.trajectory), stalled=stalled, generation=generation, elapsed=elapsed)
 
-        for j in range(0, self._maximumGeneration):
-            print("Optimising Swarm: No.", j+1)
+    def _saveCheckpoint(self, state):
+        """ Writes the state of the run and the memoised fitness values to the checkpoint file."""
 
-            # Global best particle (initialisation)
-            globalBest = self.swarmOfParticles[0].particlePosition
+        os.makedirs(os.path.dirname(self._checkpoint) or ".", exist_ok=True)
 
-            for a in range(0, self._sizeOfSwarm):
+        writeAtomically(self._checkpoint, dict(state, fitness=self._classifier.fitnessEntries()))
 
-                # location of previous best particle
-                previousLocation = self.swarmOfParticles[a].previousBest
-                # pointer to best particles list
-                particle = self.swarmOfParticles[a].particlePosition
+    def _loadCheckpoint(self, signature):
+        """ Returns the state of an unfinished run of the same optimisation, None when there is none.
+        A checkpoint of another optimisation is never overwritten, it raises a ValueError instead."""
 
-                # Update the personal best position (find pbest)
-                if self._evalBFitness(xTrain, yTrain, particle) < self._evalBFitness(xTrain, yTrain, previousLocation):
-                    self.swarmOfParticles[a].previousBest = particle
-                elif self._evalBFitness(xTrain, yTrain, particle) == self._evalBFitness(xTrain, yTrain, previousLocation) and abs(self._evalBFitness(xTrain, yTrain, particle)) < abs(self._evalBFitness(xTrain, yTrain, previousLocation)):
-                    self.swarmOfParticles[a].previousBest = particle
+        if self._checkpoint is None or not os.path.exists(self._checkpoint):
+            return None
 
-            for b in range(0, self._sizeOfSwarm):
+        try:
+            with open(self._checkpoint, "rb") as entry:
+                state = pickle.load(entry)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            state = None
 
-                # pointer to list of best particles
-                previousLocation = self.swarmOfParticles[b].previousBest
+        if not isinstance(state, dict) or state.get("signature") != signature:
+            raise ValueError("Checkpoint '{}' belongs to another optimisation (data, search space, classifier, "
+                             "fidelity or stopping criteria differ), remove it or choose another checkpoint file.".format(
+                                 self._checkpoint))
 
-                # Update the GLOBAL best position (find gbest)
-                if self._evalBFitness(xTrain, yTrain, previousLocation) < self._evalBFitness(xTrain, yTrain, globalBest):
+        return state
 
-                    # setting global best to previous best location
-                    globalBest = previousLocation
-                    self.candidateTotal.append(globalBest)
+    def _generationFidelity(self, generation):
+        """ Returns the fidelity of a generation, rising towards full fidelity in the style of successive halving.
+        The last generation is one rung below full fidelity, which is reserved for the promoted candidates."""
+
+        if not self._multiFidelity:
+            return None
+
+        return Fidelity.level(max(1, self._stopping.maxGenerations - generation), self._eta)
+
+    def _promoteCandidates(self, xTrain, yTrain, fidelity):
+        """ Re-evaluates the best 1/eta of the distinct personal bests at full fidelity and returns the best of them."""
+
+        candidates = np.unique(
+            self.searchSpace.clip(self.previousBest), axis=0)
+        candidates = candidates[np.argsort(self._evaluatePositions(
+            xTrain, yTrain, candidates, fidelity=fidelity), kind="stable")]
+        promoted = candidates[:max(1, math.ceil(len(candidates) / self._eta))]
+
+        print("Promoting", len(promoted), "candidates to full fidelity...")
 
-                elif self._evalBFitness(xTrain, yTrain, previousLocation) == self._evalBFitness(xTrain, yTrain, globalBest) and abs(self._evalBFitness(xTrain, yTrain, previousLocation)) < abs(self._evalBFitness(xTrain, yTrain, globalBest)):
+        # the best candidate at low fidelity when the evaluation budget leaves none to promote
+        globalBest, bestFitness = promoted[0], None
+        for position in promoted:
+            fitness = self._evaluatePositions(
+                xTrain, yTrain, position[None], None if bestFitness is None else [bestFitness])[0]
+            if not np.isnan(fitness) and (bestFitness is None or fitness < bestFitness):
+                globalBest, bestFitness = position, fitness
 
+        return self.searchSpace.toResult(globalBest)
+
+    def _settleParticle(self, particle, fitness, globalBest, globalFitness):
+        """ Updates the personal and global best with the fitness of one particle of the steady state swarm and moves it
+        towards the global best at once. Returns the global best position and fitness."""
+
+        if fitness < self.previousFitness[particle]:
+            self.previousBest[particle] = self.particlePosition[particle]
+            self.previousFitness[particle] = fitness
+
+        if fitness < globalFitness:
+            globalBest, globalFitness = self.particlePosition[particle].copy(), fitness
+            self.candidateTotal.append(self.searchSpace.toResult(globalBest))
+
+        self.updateParticles(globalBest, [particle])
+
+        return globalBest, globalFitness
+
+    def _steadyStateSwarm(self, xTrain, yTrain):
+        """ Asynchronous particle swarm which keeps every worker busy. Each particle is evaluated against its personal best,
+        moved with the global best of that moment as soon as its result returns and submitted again.
+        A generation is counted for every swarmSize evaluations. Returns the global best position."""
+
+        print("Initialising Swarm...")
+
+        self.candidateTotal = []
+        self.requested = 0
+        self.evaluations = 0
+        self.stopReason = None
+        self.initialiseSwarm()
+        self._beginTelemetry(mode="asynchronous", stopping=repr(self._stopping))
+
+        globalBest, globalFitness = self.particlePosition[0].copy(), np.inf
+        start = time.perf_counter()
+        completed, lastImprovement = 0, 0
+        workers, coreBudget = allocateCores(self._coreBudget, self.swarmSize)
+
+        # particles waiting for a worker, and the particle of every evaluation in flight
+        waiting = list(range(self.swarmSize))
+        pending = {}
+        pool = None
+
+        try:
+            if workers > 1:
+                collect = self._workerDispatch(xTrain, yTrain)
+                # a pool of this run alone, the shared executor of joblib is left to the fold level Parallel calls
+                pool = ProcessPoolExecutor(max_workers=workers)
+
+            while self.stopReason is None:
+                results = []
+
+                # particles at a memoised position are settled at once, the others are submitted while workers are free
+                # and the evaluation budget is not spent
+                while waiting and not results and len(pending) < workers:
+                    particle = waiting[0]
+                    position = self.searchSpace.toResult(
+                        self.searchSpace.clip(self.particlePosition[particle]))
+                    incumbent = self.previousFitness[particle] if np.isfinite(
+                        self.previousFitness[particle]) else None
+                    fitness = self._classifier.cachedFitness(position, xTrain, yTrain)
+
+                    if fitness is None and self._evaluationsLeft() == 0:
+                        break
+
+                    waiting.pop(0)
+                    if fitness is not None:
+                        self.requested += 1
+                        results = [(particle, fitness)]
+                    elif workers == 1:
+                        results = [(particle, self._evalBFitness(
+                            xTrain, yTrain, self.particlePosition[particle], incumbent))]
+                    else:
+                        self.requested += 1
+                        self.evaluations += 1
+                        pending[pool.submit(_particleFitness, self._classifier, xTrain, yTrain, position, incumbent,
+                                            None, coreBudget)] = (particle, position)
+
+                if not results and pending:
+                    # wait for the first evaluation in flight to return
+                    done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        particle, position = pending.pop(future)
+                        results.append((particle, collect(position, future.result())))
+
+                for particle, fitness in results:
+                    if fitness < globalFitness:
+                        lastImprovement = completed + 1
+                    globalBest, globalFitness = self._settleParticle(
+                        particle, fitness, globalBest, globalFitness)
+                    waiting.append(particle)
+
+                    completed += 1
+                    if completed % self.swarmSize == 0:
+                        print("Optimising Swarm: No.", completed // self.swarmSize)
+                        self._recordGeneration(completed // self.swarmSize, globalFitness,
+                                               self.searchSpace.toResult(globalBest), self.particlePosition)
+
+                # evaluations in flight are counted once they return, so a spent budget waits for them
+                self.stopReason = self._stopping.reason(
+                    completed // self.swarmSize, (completed - lastImprovement) // self.swarmSize,
+                    self.swarmDiameter(), self.evaluations - len(pending), time.perf_counter() - start)
+
+            # evaluations in flight no longer move the swarm: those not started are cancelled and not counted,
+            # the results of those already running are drained into the fitness cache
+            for future, (particle, position) in pending.items():
+                if future.cancel():
+                    self.requested -= 1
+                    self.evaluations -= 1
+                    continue
+                collect(position, future.result())
+            pending = {}
+
+        finally:
+            if pool is not None:
+                # an interrupted run leaves nothing queued behind it
+                for future in pending:
+                    future.cancel()
+                pool.shutdown(wait=True)
+
+        print("Stopping Swarm:", self.stopReason)
+
+        return globalBest
+
+    def metaOpt(self, xTrain, yTrain, forest):
+        """ Metaheuristic algorithm for hyperparameter tuning.
+        Small search spaces are searched exhaustively, which costs fewer fits than one generation of the swarm.
+        Returns the amount of features, or the dictionary of hyperparameters of a multi-dimensional search space.
+        With a checkpoint file the swarm is saved between generations and an interrupted run on the same data
+        resumes exactly where it stopped, the file is removed once the optimisation finishes."""
+
+        if self._searchesExhaustively():
+            return self._exhaustiveOptimum(xTrain, yTrain)
+
+        self._evaluationLimit = self._stopping.maxEvaluations
+
+        if self._asynchronous:
+            return self._finishOptimisation(self._steadyStateSwarm(xTrain, yTrain))
+
+        signature = self._checkpointSignature(xTrain, yTrain)
+        state = self._loadCheckpoint(signature)
+
+        if state is None:
+            print("Initialising Swarm...")
+
+            # every optimisation starts a new session, nothing is carried over from a previous run
+            self.candidateTotal = []
+            self.requested = 0
+            self.evaluations = 0
+            # mixed initialisation of every particle at once
+            self.initialiseSwarm()
+
+            # generations in a row which did not move the global best
+            stalled = 0
+            j = 0
+            elapsed = 0.0
+        else:
+            # an interrupted run continues with the swarm, random draws and fitness values it had
+            self.restoreSwarm(state)
+            self._classifier.restoreFitness(state["fitness"])
+            self.candidateTotal = list(state["candidateTotal"])
+            stalled, j, elapsed = state["stalled"], state["generation"], state["elapsed"]
+            print("Resuming Swarm from generation", j + 1, "of checkpoint", self._checkpoint)
+
+        self._beginTelemetry(mode="synchronous", stopping=repr(self._stopping), resumed=state is not None)
+        if state is not None:
+            self.trajectory = list(state["trajectory"])
+
+        self.stopReason = None
+        globalBest = self.particlePosition[0].copy()
+        start = time.perf_counter() - elapsed
+
+        # the state at the start of the latest generation, saved again when the run is interrupted
+        latestState = self._runState(signature, stalled, j, elapsed)
+        if self._checkpoint is not None and state is None:
+            self._saveCheckpoint(latestState)
+
+        try:
+            while self.stopReason is None:
+                print("Optimising Swarm: No.", j+1)
+
+                # cost of the evaluations made during this generation
+                fidelity = self._generationFidelity(j)
+
+                # Global best particle (initialisation)
+                globalBest = self.particlePosition[0].copy()
+
+                # the personal best is the incumbent each particle has to beat
+                self.previousFitness = self._evaluatePositions(
+                    xTrain, yTrain, self.previousBest, fidelity=fidelity)
+                particleFitness = self._evaluatePositions(
+                    xTrain, yTrain, self.particlePosition, self.previousFitness, fidelity)
+
+                # Update the personal best positions (find pbest)
+                improved = particleFitness < self.previousFitness
+                self.previousBest = np.where(
+                    improved[:, None], self.particlePosition, self.previousBest)
+                self.previousFitness = np.where(
+                    improved, particleFitness, self.previousFitness)
+
+                # Update the GLOBAL best position (find gbest), the personal bests are scanned in particle order
+                # and every personal best better than all before it becomes the global best,
+                # positions left out by the evaluation budget (NaN) never do
+                globalFitness = self._evaluatePositions(
+                    xTrain, yTrain, globalBest[None], fidelity=fidelity)
+                scanned = np.nan_to_num(np.concatenate((globalFitness, self.previousFitness)), nan=np.inf, posinf=np.inf)
+                runningBest = np.minimum.accumulate(scanned)
+                improvements = np.flatnonzero(
+                    scanned[1:] < runningBest[:-1])
+
+                latestBest = self.candidateTotal[-1] if self.candidateTotal else None
+                self.candidateTotal.extend(self.searchSpace.toResult(position)
+                                           for position in self.previousBest[improvements])
+                if len(improvements) > 0:
                     # setting global best to previous best location
-                    globalBest = previousLocation
-                    self.candidateTotal.append(globalBest)
+                    globalBest = self.previousBest[improvements[-1]]
 
-            for c in range(0, self._sizeOfSwarm):
+                stalled = stalled + 1 if not self.candidateTotal or self.candidateTotal[-1] == latestBest else 0
+                self._recordGeneration(j + 1, runningBest[-1], self.searchSpace.toResult(globalBest), self.particlePosition)
 
                 # Update velocities and position of each particle
-                self.swarmOfParticles[c].updateParticle(globalBest)
+                self.updateParticles(globalBest)
+
+                j += 1
+                self.stopReason = self._stopping.reason(
+                    j, stalled, self.swarmDiameter(), self.evaluations, time.perf_counter() - start)
+
+                if self.stopReason is None:
+                    latestState = self._runState(
+                        signature, stalled, j, time.perf_counter() - start)
+                    if self._checkpoint is not None and j % self._checkpointInterval == 0:
+                        self._saveCheckpoint(latestState)
+
+        except KeyboardInterrupt:
+            if self._checkpoint is not None:
+                # fitness values computed since the latest generation are kept, so resuming repeats no fit
+                self._saveCheckpoint(dict(latestState, requested=self.requested, evaluations=self.evaluations))
+                print("Swarm interrupted, resume it from checkpoint", self._checkpoint)
+            raise
+
+        print("Stopping Swarm:", self.stopReason)
+
+        if self._multiFidelity:
+            # only the final candidates are evaluated at full fidelity
+            self.candidateTotal.append(
+                self._promoteCandidates(xTrain, yTrain, fidelity))
+
+        return self._finishOptimisation(globalBest)
+
+    def _finishOptimisation(self, globalBest):
+        """ Announces and returns the result of the swarm and releases its state."""
 
-        # return the position of globalbest (the selected feature subset);
-        valuesM = self.candidateTotal[-1]
-        values = int(valuesM)
+        # return the position of globalbest (the selected feature subset), the initial one when it never improved,
+        # positions outside the search space are evaluated at its nearest bound
+        values = self.candidateTotal[-1] if self.candidateTotal else self.searchSpace.toResult(globalBest)
         print(len(self.candidateTotal), "global best solutions found.")
-        intVariable = "Optimal feature for classifier is {}".format(values)
-        print(intVariable)
+        print(self._describe(values))
+        self._endTelemetry(values)
+
+        # the swarm of a finished optimisation is not needed any more
+        self.releaseSwarm()
+        if self._checkpoint is not None and os.path.exists(self._checkpoint):
+            # a finished optimisation is never resumed
+            os.remove(self._checkpoint)
 
         return values
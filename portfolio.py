@@ -0,0 +1,107 @@
+""" This module is responsible for evaluating a model across every stock symbol of a portfolio in parallel."""
+
+from __future__ import annotations
+from abc import ABC, abstractmethod
+import contextlib
+import io
+import logging
+import time
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from threadpoolctl import threadpool_limits
+from executor import allocateCores, resolveCoreBudget
+
+# constituents of the NASDAQ-100 index (2021), evaluated when the whole index is selected
+nasdaq100 = [
+    "AAPL", "ADBE", "ADI", "ADP", "ADSK", "AEP", "ALGN", "AMAT", "AMD", "AMGN",
+    "AMZN", "ANSS", "ASML", "ATVI", "AVGO", "BIDU", "BIIB", "BKNG", "CDNS", "CDW",
+    "CERN", "CHKP", "CHTR", "CMCSA", "COST", "CPRT", "CRWD", "CSCO", "CSX", "CTAS",
+    "CTSH", "DLTR", "DOCU", "DXCM", "EA", "EBAY", "EXC", "FAST", "FB", "FISV",
+    "FOX", "FOXA", "GILD", "GOOG", "GOOGL", "HON", "IDXX", "ILMN", "INCY", "INTC",
+    "INTU", "ISRG", "JD", "KDP", "KHC", "KLAC", "LRCX", "LULU", "MAR", "MCHP",
+    "MDLZ", "MELI", "MNST", "MRNA", "MRVL", "MSFT", "MTCH", "MU", "NFLX", "NTES",
+    "NVDA", "NXPI", "OKTA", "ORLY", "PAYX", "PCAR", "PDD", "PEP", "PTON", "PYPL",
+    "QCOM", "REGN", "ROST", "SBUX", "SGEN", "SIRI", "SNPS", "SPLK", "SWKS", "TCOM",
+    "TEAM", "TMUS", "TSLA", "TXN", "VRSK", "VRSN", "VRTX", "WBA", "WDAY", "XEL",
+    "XLNX", "ZM",
+]
+
+
+def _evaluateTicker(evaluate, ticker, coreBudget, quiet):
+    """ Runs the evaluation of one ticker within its share of the core budget.
+    A failing ticker (no price history, too few rows, ...) is recorded instead of stopping the portfolio."""
+
+    started = time.perf_counter()
+    output = io.StringIO() if quiet else None
+
+    try:
+        with threadpool_limits(limits=coreBudget), \
+                (contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext()):
+            mae, rmse = evaluate(ticker, coreBudget)
+        error = ""
+    except Exception as exception:  # pylint: disable=broad-except
+        logging.exception("Evaluation failed: %s", ticker)
+        mae, rmse, error = np.nan, np.nan, "{}: {}".format(
+            type(exception).__name__, exception)
+
+    return {"ticker": ticker, "mae": float(mae), "rmse": float(rmse),
+            "seconds": time.perf_counter() - started, "error": error}
+
+
+class PortfolioEvaluation(ABC):
+    """ Evaluation interface for running a model evaluation across the symbols of a portfolio."""
+
+    @abstractmethod
+    def evaluatePortfolio(self, tickers, evaluate) -> pd.DataFrame:
+        pass
+
+    @abstractmethod
+    def summarise(self, results) -> pd.DataFrame:
+        pass
+
+
+class PortfolioEvaluator(PortfolioEvaluation):
+
+    """ Evaluates every ticker of a portfolio across a process pool.
+
+    The core budget is split between ticker level workers and the cores each evaluation may use for its own
+    cross validation folds, with the same split as the fold executor, so the two levels never oversubscribe the machine.
+    The evaluation is any picklable callable evaluate(ticker, coreBudget) returning the (mae, rmse) of the ticker."""
+
+    def __init__(self, coreBudget=None):
+        self._coreBudget = resolveCoreBudget(coreBudget)
+
+    @property
+    def coreBudget(self) -> int:
+        return self._coreBudget
+
+    def evaluatePortfolio(self, tickers, evaluate):
+        """ Returns one row per ticker, in the order given, with its mean absolute error, root mean squared error,
+        evaluation time and error message (empty when the evaluation succeeded)."""
+
+        # duplicated symbols are evaluated once
+        tickers = list(dict.fromkeys(tickers))
+        tickerWorkers, tickerBudget = allocateCores(self._coreBudget, len(tickers))
+
+        if tickerWorkers == 1:
+            # a single worker keeps the progress output of each evaluation
+            results = [_evaluateTicker(evaluate, ticker, tickerBudget, False)
+                       for ticker in tickers]
+        else:
+            # interleaved progress output of parallel evaluations is discarded
+            results = Parallel(n_jobs=tickerWorkers, backend="loky")(
+                delayed(_evaluateTicker)(evaluate, ticker, tickerBudget, True) for ticker in tickers)
+
+        return pd.DataFrame(results, columns=["ticker", "mae", "rmse", "seconds", "error"])
+
+    def summarise(self, results):
+        """ Returns the per ticker table followed by the aggregate rows (mean, median, worst) over successful tickers."""
+
+        succeeded = results.loc[results["error"] == "", ["mae", "rmse", "seconds"]]
+
+        aggregates = succeeded.agg(["mean", "median", "max"])
+        aggregates.insert(0, "ticker", ["MEAN", "MEDIAN", "WORST"])
+        aggregates["error"] = ""
+
+        return pd.concat([results, aggregates], ignore_index=True)
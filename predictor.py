@@ -0,0 +1,130 @@
+""" This module is responsible for batch inference: scoring many tickers and dates with the models saved in the model store."""
+
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+import sys
+import numpy as np
+import pandas as pd
+from processor import ConcreteProcessor
+
+# builder method which creates each engineered feature, raw price columns need none
+_featureBuilders = {
+    "SMA_7": "createSMA",
+    "SMA_21": "createSMA",
+    "SMA_RATIO": "createSMA",
+    "STOCH_7": "createStochastic",
+    "STOCH_21": "createStochastic",
+    "STOCH_RATIO": "createStochastic",
+    "RSI_7": "createRSI",
+    "RSI_21": "createRSI",
+    "MACD": "createMACD",
+    "RC": "createRC",
+}
+
+# calendar days downloaded before the first date so that the longest indicator windows are filled
+_warmUpDays = 60
+
+
+class Predictor(ABC):
+    """ Predictor interface for scoring stock portfolios with previously fitted models."""
+
+    @abstractmethod
+    def predictBatch(self, tickers, startPeriod, endPeriod, modelMap=None) -> pd.DataFrame:
+        pass
+
+
+class BatchPredictor(Predictor):
+
+    """ Scores a list of tickers over a date range in one pass.
+
+    The latest saved model of each ticker is looked up (or the model named in modelMap), only the features those
+    models use are engineered, and the rows of every ticker sharing a model are predicted with one vectorised call."""
+
+    def __init__(self, modelStore, col):
+        self._modelStore = modelStore
+        self._col = col
+
+    def _buildFeatures(self, tickers, startPeriod, endPeriod, features):
+        """ Downloads the portfolio of every ticker and engineers only the requested features."""
+
+        builder = ConcreteProcessor(self._col)
+        for ticker in tickers:
+            builder.downloadData(ticker, startPeriod -
+                                 timedelta(days=_warmUpDays), endPeriod)
+
+        # each builder method is run once, however many of its features are needed
+        for method in dict.fromkeys(_featureBuilders[feature] for feature in features if feature in _featureBuilders):
+            getattr(builder, method)()
+
+        stockPort = builder.stockPort
+        stockPort.index = pd.to_datetime(stockPort.index)
+
+        return stockPort.loc[stockPort.index >= pd.Timestamp(startPeriod)]
+
+    def predictBatch(self, tickers, startPeriod, endPeriod, modelMap=None):
+        """ Returns a tidy frame with one row per ticker and date: the model used and its prediction.
+        Predictions are converted back into prices when the model saved the standardisation of its response."""
+
+        modelMap = dict(modelMap or {})
+        # the ticker whose model scores each requested ticker, its own by default
+        requests = {ticker: modelMap.get(ticker, ticker) for ticker in tickers}
+
+        models = {modelTicker: self._modelStore.loadModel(modelTicker)
+                  for modelTicker in dict.fromkeys(requests.values())}
+
+        features = set()
+        for _, metadata in models.values():
+            features.update(metadata["features"])
+
+        stockPort = self._buildFeatures(
+            list(requests), startPeriod, endPeriod, features)
+
+        frames = []
+        for modelTicker, (model, metadata) in models.items():
+
+            # every row of every ticker sharing this model is predicted at once
+            scored = [ticker for ticker,
+                      owner in requests.items() if owner == modelTicker]
+            rows = stockPort.loc[stockPort["STOCK-NAME"].isin(
+                scored), ["STOCK-NAME"] + metadata["features"]].dropna()
+            if rows.empty:
+                continue
+
+            exploratory = rows.loc[:, metadata["features"]].to_numpy(dtype=float)
+            # reproduce the winsorizing and standardisation seen during training
+            exploratory = np.clip(
+                exploratory, metadata["featureLower"], metadata["featureUpper"])
+            exploratory = (exploratory - np.asarray(metadata["featureMeans"])) / \
+                np.where(np.asarray(metadata["featureScales"]) == 0,
+                         1, metadata["featureScales"])
+
+            prediction = np.ravel(model.predict(exploratory))
+            if "responseMean" in metadata:
+                prediction = prediction * \
+                    metadata["responseScale"] + metadata["responseMean"]
+
+            frames.append(pd.DataFrame({"ticker": rows["STOCK-NAME"].to_numpy(),
+                                        "date": rows.index,
+                                        "model": modelTicker,
+                                        "version": metadata["version"],
+                                        "prediction": prediction}))
+
+        columns = ["ticker", "date", "model", "version", "prediction"]
+        if not frames:
+            return pd.DataFrame(columns=columns)
+
+        return pd.concat(frames, ignore_index=True).sort_values(["ticker", "date"], ignore_index=True)
+
+
+if __name__ == "__main__":
+
+    from colours import Colours
+    from modelstore import ModelStore
+
+    # score the tickers given on the command line over the last 30 days
+    endPeriod = datetime.now()
+    startPeriod = endPeriod - timedelta(days=30)
+
+    predictor = BatchPredictor(ModelStore("models"), Colours())
+    print(predictor.predictBatch(sys.argv[1:], startPeriod, endPeriod).to_string(index=False))
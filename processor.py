@@ -8,6 +8,22 @@ from scipy.stats import mstats
 import yfinance as yf
 # --------------------------------------------------------------------------------------------------
 
+# Target variables
+targetVariables = [
+    "Open",  # Daily open
+    "Close",  # Daily close
+    "SMA_7",  # 7 day SMA
+    "SMA_21",  # 21 day SMA
+    "SMA_RATIO",  # SMA ratio 21/7 day
+    "STOCH_7",  # Stochastic 7 day
+    "STOCH_21",  # Stochastic 21 day
+    "STOCH_RATIO",  # Stochastic ratio 21/7 day
+    "RSI_7",  # RSI 7 day
+    "RSI_21",  # RSI 21 day
+    "MACD",  # Moving average convergence divergence
+    "RC",  # Rate of change
+]
+
 
 class Processor(ABC):
     """ Processor interface for creating different forms of stock portfolios for the 3 different models."""
@@ -36,6 +52,10 @@ class Processor(ABC):
     def createRC(self) -> pd.DataFrame:
         pass
 
+    @abstractmethod
+    def prepareFeatures(self) -> list:
+        pass
+
     @abstractmethod
     def splitPreparation(self, scaler) -> pd.DataFrame:
         pass
@@ -44,6 +64,14 @@ class Processor(ABC):
     def splitPreparationRF(self, scaler) -> pd.DataFrame:
         pass
 
+    @abstractmethod
+    def createLabels(self, labeller) -> pd.DataFrame:
+        pass
+
+    @abstractmethod
+    def splitPreparationMH(self, scaler, labelNames) -> pd.DataFrame:
+        pass
+
 
 class ConcreteProcessor(Processor):
     """Follows the implementation details provided in the interface in order to build the portfolio in the specified manner needed for the model of choice.
@@ -54,6 +82,7 @@ class ConcreteProcessor(Processor):
         stockPort = pd.DataFrame()  # Create empty pd.DataFrame for portfolio of stock
         self.stockPort = stockPort
         self._col = col
+        self.responseStatistics = {}
 
     def downloadData(self, tickerName, startPeriod, endPeriod) -> pd.DataFrame:
         """ Extracts price series data from yahoo finance."""
@@ -218,24 +247,8 @@ class ConcreteProcessor(Processor):
 
         return self.stockPort
 
-    def splitPreparation(self, scaler) -> pd.DataFrame:
-        """ Prepares portfolio holder into the splits required for training and testing of machine learning models."""
-
-        # Target variables
-        targetVariables = [
-            "Open",  # Daily open
-            "Close",  # Daily close
-            "SMA_7",  # 7 day SMA
-            "SMA_21",  # 21 day SMA
-            "SMA_RATIO",  # SMA ratio 21/7 day
-            "STOCH_7",  # Stochastic 7 day
-            "STOCH_21",  # Stochastic 21 day
-            "STOCH_RATIO",  # Stochastic ratio 21/7 day
-            "RSI_7",  # RSI 7 day
-            "RSI_21",  # RSI 21 day
-            "MACD",  # Moving average convergence divergence
-            "RC",  # Rate of change
-        ]
+    def prepareFeatures(self) -> list:
+        """ Winsorizes the target variables shared by every model and returns their names."""
 
         for variable in targetVariables:  # Winsorizing indicators within upper 10 and lower 10 percentile range
             self.stockPort.loc[:, variable] = mstats.winsorize(
@@ -244,6 +257,14 @@ class ConcreteProcessor(Processor):
         # Converting pd.DataFrame index in order to do time series split
         self.stockPort.index = pd.to_datetime(self.stockPort.index)
 
+        return list(targetVariables)
+
+    def splitPreparation(self, scaler) -> pd.DataFrame:
+        """ Prepares portfolio holder into the splits required for training and testing of machine learning models."""
+
+        # Target variables, winsorized
+        targetVariables = self.prepareFeatures()
+
         # Training set - 60% of data
         dataForTraining = self.stockPort.loc[:"2015-12-31", ]
 
@@ -274,34 +295,16 @@ class ConcreteProcessor(Processor):
         yTest = scaler.fit_transform(responseTesting.values.reshape(-1, 1))
         # Convert to 1-dimensional array
         yTS = np.ravel(yTest)
+        # kept so that standardised predictions can be converted back into prices
+        self.responseStatistics = {"responseMean": float(scaler.mean_[0]),
+                                   "responseScale": float(scaler.scale_[0])}
 
         return xS, yS, xTS, yTS, targetVariables, exploratoryTraining, exploratoryTesting
 
     def splitPreparationRF(self, scaler) -> pd.DataFrame:
         """ Prepares portfolio holder into the splits required for training and testing of machine learning models."""
-        # Target variables
-
-        targetVariables = [
-            "Open",  # Daily open
-            "Close",  # Daily close
-            "SMA_7",  # 7 day SMA
-            "SMA_21",  # 21 day SMA
-            "SMA_RATIO",  # SMA ratio 21/7 day
-            "STOCH_7",  # Stochastic 7 day
-            "STOCH_21",  # Stochastic 21 day
-            "STOCH_RATIO",  # Stochastic ratio 21/7 day
-            "RSI_7",  # RSI 7 day
-            "RSI_21",  # RSI 21 day
-            "MACD",  # Moving average convergence divergence
-            "RC",  # Rate of change
-        ]
-
-        for variable in targetVariables:  # Winsorizing indicators within upper 10 and lower 10 percentile range
-            self.stockPort.loc[:, variable] = mstats.winsorize(
-                self.stockPort.loc[:, variable], limits=[0.1, 0.1])
-
-        # Converting pd.DataFrame index in order to do time series split
-        self.stockPort.index = pd.to_datetime(self.stockPort.index)
+        # Target variables, winsorized
+        targetVariables = self.prepareFeatures()
 
         # Test set - 40% of data
         dataForTesting = self.stockPort.loc[:"2016-01-01":]
@@ -320,6 +323,40 @@ class ConcreteProcessor(Processor):
 
         return xTS, yTS
 
+    def createLabels(self, labeller) -> pd.DataFrame:
+        """ Creates the forward looking response variables for every horizon of the labeller in one pass."""
+
+        labels = labeller.createLabels(self.stockPort)
+        self.stockPort = self.stockPort.join(labels)
+
+        return self.stockPort
+
+    def splitPreparationMH(self, scaler, labelNames) -> pd.DataFrame:
+        """ Prepares portfolio holder into the splits required for training and testing of the multi-horizon models.
+        The response of each split is a 2-dimensional array holding one column per horizon."""
+
+        # Target variables, winsorized
+        targetVariables = self.prepareFeatures()
+
+        # The last rows of each stock have no future price for the longest horizons
+        labelled = self.stockPort.dropna(subset=labelNames)
+
+        # Training set - 60% of data
+        dataForTraining = labelled.loc[:"2015-12-31", ]
+
+        # Test set - 40% of data
+        dataForTesting = labelled.loc["2016-01-01":]
+
+        # Exploratory variables, standardised and transformed
+        xS = scaler.fit_transform(dataForTraining.loc[:, targetVariables])
+        xTS = scaler.fit_transform(dataForTesting.loc[:, targetVariables])
+
+        # Response variables, one standardised column per horizon
+        yS = scaler.fit_transform(dataForTraining.loc[:, labelNames])
+        yTS = scaler.fit_transform(dataForTesting.loc[:, labelNames])
+
+        return xS, yS, xTS, yTS
+
 
 class Director:
 
@@ -360,6 +397,11 @@ class Director:
 
         return xS, yS, xTS, yTS, targetVARS, exploratoryTraining, exploratoryTesting
 
+    def responseStatistics(self) -> dict:
+        """ Returns the mean and scale used to standardise the response of the testing split."""
+
+        return self._builder.responseStatistics
+
     def processingHandlerRF(self) -> pd.DataFrame:
         """ Helper function to action the processing process for the random forests from start to finish."""
 
@@ -387,3 +429,34 @@ class Director:
               "Progressing to results..." + self._col.endFont)
 
         return xS, yS
+
+    def processingHandlerMH(self, labeller) -> pd.DataFrame:
+        """ Helper function to action the processing process for the multi-horizon models from start to finish."""
+
+        # Calling methods to create technical indicators
+        self._builder.downloadData(self._listOfSymbols,
+                                   self._startPeriod, self._endPeriod)
+
+        print("-----------------------------------Feature Engineering-----------------------------------------")
+        print("Creating SMA...")
+        self._builder.createSMA()
+        print("Creating STOCH...")
+        self._builder.createStochastic()
+        print("Creating RSI...")
+        self._builder.createRSI()
+        print("Creating MACD...")
+        self._builder.createMACD()
+        print("Creating RC...")
+        self._builder.createRC()
+        print("Creating Forward Labels...")
+        self._builder.createLabels(labeller)
+        # Creating training and testing splits
+        print("Creating Training/Testing Splits...")
+        xS, yS, xTS, yTS = self._builder.splitPreparationMH(
+            self._scaler, labeller.labelNames())
+        print(self._col.boldFont + self._col.purpleFont +
+              "[ALERT] " + self._col.endFont + "Feature Engineering completed.")
+        print(self._col.boldFont + self._col.italicFont +
+              "Progressing to results..." + self._col.endFont)
+
+        return xS, yS, xTS, yTS
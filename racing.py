@@ -0,0 +1,66 @@
+""" This module contains the racing evaluator which abandons a candidate's cross validation once it cannot win."""
+
+from __future__ import annotations
+from abc import ABC, abstractmethod
+import numpy as np
+
+
+class Evaluator(ABC):
+    """ Evaluator interface for scoring a candidate model against the incumbent."""
+
+    @abstractmethod
+    def race(self, model, exploratory, response, splits, incumbent, scheme=None) -> tuple:
+        pass
+
+
+class RacingEvaluator(Evaluator):
+
+    """ Scores the folds of a cross validation in order, one batch of fold workers at a time,
+    and stops as soon as the candidate's mean error can no longer beat the incumbent.
+
+    Bounds available:
+    1. 'safe' - folds not yet scored are assumed to have zero error, so a candidate is only
+       abandoned once it provably cannot win.
+    2. 'optimistic' - folds not yet scored are assumed to match the best fold seen so far,
+       which abandons poor candidates sooner at the risk of dropping a late winner."""
+
+    _bounds = ("safe", "optimistic")
+
+    def __init__(self, executor, bound="safe"):
+
+        if bound not in self._bounds:
+            raise ValueError("Unknown racing bound '{}'.".format(bound))
+
+        self._executor = executor
+        self._bound = bound
+
+    def _lowerBound(self, errors, nFolds):
+        """ Returns the smallest mean error the candidate could still finish with."""
+
+        remaining = nFolds - len(errors)
+        best = min(errors) if self._bound == "optimistic" else 0.0
+
+        return (sum(errors) + remaining * best) / nFolds
+
+    def race(self, model, exploratory, response, splits, incumbent, scheme=None):
+        """ Returns the mean absolute error of the candidate, whether every fold was scored, and the folds scored.
+        An abandoned candidate returns its lower bound, which is never smaller than the incumbent."""
+
+        splits = list(splits)
+        nFolds = len(splits)
+        # one batch keeps every fold worker busy
+        batchSize, _ = self._executor.allocate(nFolds)
+
+        errors = []
+        for start in range(0, nFolds, batchSize):
+            indices = list(range(start, min(start + batchSize, nFolds)))
+            folds = self._executor.runFolds(
+                model, exploratory, response, [splits[index] for index in indices], scheme=scheme, indices=indices)
+            errors.extend(float(np.mean(fold["mae"])) for fold in folds)
+
+            if incumbent is not None and len(errors) < nFolds:
+                bound = self._lowerBound(errors, nFolds)
+                if bound >= incumbent:
+                    return bound, False, len(errors)
+
+        return float(np.mean(errors)), True, nFolds
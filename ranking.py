@@ -0,0 +1,78 @@
+""" This module contains the feature ranking service which orders the exploratory variables by importance once per dataset."""
+
+from __future__ import annotations
+from abc import ABC, abstractmethod
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.inspection import permutation_importance
+from sklearn.model_selection import TimeSeriesSplit
+from cache import LRUCache, hashDataset
+
+
+class Ranker(ABC):
+    """ Ranking interface for ordering the exploratory variables of a dataset by importance."""
+
+    @abstractmethod
+    def rankFeatures(self, exploratory, response) -> list:
+        pass
+
+
+class FeatureRanker(Ranker):
+
+    """ Computes the feature importance ordering of a dataset once and caches it.
+
+    Methods available:
+    1. 'impurity' - squared error impurity decrease of the forest (fastest).
+    2. 'permutation' - permutation importance on the held-out block, repeats run in parallel.
+    3. 'mae' - absolute error impurity decrease, the original and slowest criterion."""
+
+    _methods = ("impurity", "permutation", "mae")
+
+    def __init__(self, method="impurity", cache=None, nJobs=-1):
+
+        if method not in self._methods:
+            raise ValueError("Unknown feature ranking method '{}'.".format(method))
+
+        self._method = method
+        self._cache = cache if cache is not None else LRUCache()
+        self._nJobs = nJobs
+
+    def __repr__(self):
+        return "FeatureRanker(method={!r})".format(self._method)
+
+    def rankFeatures(self, exploratory, response):
+        """ Returns the column indices sorted in order of increasing importance."""
+
+        key = (hashDataset(exploratory, response), self._method)
+
+        orderedIndex = self._cache.get(key)
+        if orderedIndex is None:
+            orderedIndex = self._computeRanking(exploratory, response)
+            self._cache.put(key, orderedIndex)
+
+        return list(orderedIndex)
+
+    def _computeRanking(self, exploratory, response):
+        """ Fits a single forest on the final time series split, the fold whose importances were used previously."""
+
+        criterion = "mae" if self._method == "mae" else "mse"
+        model = RandomForestRegressor(
+            n_estimators=100, random_state=0, criterion=criterion, n_jobs=self._nJobs)
+
+        # only the last of the 10 time series folds is required
+        *_, (trainINDEX, testINDEX) = TimeSeriesSplit(
+            n_splits=10).split(exploratory, response)
+
+        yTrain = np.ravel(response[trainINDEX])
+        model.fit(exploratory[trainINDEX, :], yTrain)
+
+        if self._method == "permutation":
+            result = permutation_importance(
+                model, exploratory[testINDEX, :], np.ravel(response[testINDEX]),
+                n_repeats=10, random_state=0, n_jobs=self._nJobs)
+            importances = result.importances_mean
+        else:
+            importances = model.feature_importances_
+
+        # sorting the index by increasing importance values, ties keep column order
+        return [int(index) for index in np.argsort(importances, kind="stable")]
@@ -0,0 +1,297 @@
+""" This module contains the sample-efficient alternatives to the particle swarm: random search, a tree-structured
+Parzen estimator and successive halving, and the registry the Facade creates every optimiser from."""
+
+from __future__ import annotations
+from abc import abstractmethod
+import inspect
+import math
+import time
+import numpy as np
+from classifier import Fidelity
+from executor import allocateCores
+from optimiser import Heuristic, Optimiser, SearchHelper
+
+
+class SearchBackend(SearchHelper, Optimiser):
+
+    """ Base class of the optimisers which sample the search space instead of moving a swarm.
+
+    Points are evaluated through the same machinery as the particles: distinct points once, memoised in the fitness
+    cache of the classifier and in parallel within the core budget. A generation is every swarmSize evaluations,
+    so the stopping criteria give every optimiser the same budget. The swarm diameter does not apply."""
+
+    name = ""
+
+    def __init__(self, forest, seed=None, coreBudget=None, exhaustive=None, searchSpace=None, stopping=None,
+                 telemetry=None):
+
+        # the budgets and convergence tests default to the evaluations of three generations
+        SearchHelper.__init__(self, forest, seed, coreBudget, searchSpace, exhaustive, stopping, telemetry)
+
+        self.releaseHistory()
+
+    def releaseHistory(self):
+        """ Empties the points evaluated so far."""
+
+        self.observedPosition = np.empty((0, len(self.searchSpace)))
+        self.observedFitness = np.empty(0)
+        self._bestFitness = np.inf
+
+    def _observe(self, positions, fitness) -> bool:
+        """ Adds evaluated points to the history and returns whether they improved on the best point.
+        Every batch of points is recorded as one generation of the telemetry, points left out by the evaluation
+        budget (NaN) are dropped."""
+
+        evaluated = ~np.isnan(fitness)
+        if not np.any(evaluated):
+            return False
+
+        positions, fitness = self.searchSpace.clip(positions)[evaluated], fitness[evaluated]
+        self.observedPosition = np.concatenate((self.observedPosition, positions))
+        self.observedFitness = np.concatenate((self.observedFitness, fitness))
+
+        best = int(np.argmin(fitness))
+        improved = fitness[best] < self._bestFitness
+        if improved:
+            self._bestFitness = fitness[best]
+            self.candidateTotal.append(self.searchSpace.toResult(positions[best]))
+
+        self._recordGeneration(len(self.trajectory) + 1, self._bestFitness, self.candidateTotal[-1], positions)
+
+        return improved
+
+    def _stopReason(self, stalled, start):
+        """ Returns why the search stops after the points observed so far, None while it continues."""
+
+        return self._stopping.reason(len(self.observedFitness) // self.swarmSize, stalled // self.swarmSize,
+                                     math.inf, self.evaluations, time.perf_counter() - start)
+
+    @abstractmethod
+    def _search(self, xTrain, yTrain):
+        pass
+
+    def metaOpt(self, xTrain, yTrain, forest):
+        """ Returns the best point found within the budget, the amount of features or the dictionary of
+        hyperparameters of a multi-dimensional search space. Small search spaces are searched exhaustively."""
+
+        if self._searchesExhaustively():
+            return self._exhaustiveOptimum(xTrain, yTrain)
+
+        self.candidateTotal = []
+        self.requested = 0
+        self.evaluations = 0
+        self._evaluationLimit = self._stopping.maxEvaluations
+        self.stopReason = None
+        self.releaseHistory()
+        self._beginTelemetry(stopping=repr(self._stopping))
+
+        self._search(xTrain, yTrain)
+
+        print("Stopping Search:", self.stopReason)
+        values = self.candidateTotal[-1]
+        print(len(self.candidateTotal), "best solutions found.")
+        print(self._describe(values))
+        self._endTelemetry(values)
+
+        # the history of a finished optimisation is not needed any more
+        self.releaseHistory()
+
+        return values
+
+
+class RandomSearch(SearchBackend):
+
+    """ Evaluates a generation of uniformly drawn points at a time, a baseline every optimiser should beat."""
+
+    name = "random"
+
+    def _search(self, xTrain, yTrain):
+
+        start = time.perf_counter()
+        # evaluations since the best point last improved
+        stalled = 0
+
+        while self.stopReason is None:
+            print("Sampling Search Space: No.", len(self.observedFitness) // self.swarmSize + 1)
+
+            positions = self.searchSpace.sample(self._rng, self.swarmSize)
+            fitness = self._evaluatePositions(xTrain, yTrain, positions)
+            stalled = 0 if self._observe(positions, fitness) else stalled + len(positions)
+
+            self.stopReason = self._stopReason(stalled, start)
+
+
+class TreeParzenSearch(SearchBackend):
+
+    """ Tree-structured Parzen estimator in the style of Bergstra et al.
+
+    After a few random points, the observed points are split into the best share (gamma) and the rest, each
+    modelled by a Parzen (kernel) density per dimension with a uniform prior. Candidates are drawn around the
+    best points and those with the largest ratio of the two densities are evaluated, as many at a time as
+    there are workers, and the densities are refitted after every batch."""
+
+    name = "tpe"
+
+    # share of the observed points modelling the promising region
+    _gamma = float(0.25)
+    # random points evaluated before the densities are fitted
+    _startupPoints = int(10)
+    # candidates drawn for every proposal
+    _candidates = int(64)
+    # bounds of the kernel widths, as a share of the range of every dimension
+    _bandwidthRange = (0.1, 0.5)
+
+    def _scale(self, positions) -> np.ndarray:
+        """ Returns positions rescaled to the unit cube of the search space."""
+
+        span = np.where(self.searchSpace.upper > self.searchSpace.lower,
+                        self.searchSpace.upper - self.searchSpace.lower, 1)
+
+        return (positions - self.searchSpace.lower) / span
+
+    def _bandwidth(self, centres) -> np.ndarray:
+        """ Returns the kernel width of every dimension by Scott's rule, within the bandwidth range."""
+
+        return np.clip(1.06 * np.std(centres, axis=0) * len(centres) ** -0.2, *self._bandwidthRange)
+
+    def _logDensity(self, points, centres) -> np.ndarray:
+        """ Returns the log density of every point under the Parzen estimator of the centres, the dimensions being
+        independent and each mixed with a uniform prior on the unit interval."""
+
+        bandwidth = self._bandwidth(centres)
+        kernels = np.exp(-0.5 * ((points[:, None, :] - centres[None, :, :]) / bandwidth) ** 2) \
+            / (bandwidth * math.sqrt(2 * math.pi))
+
+        return np.sum(np.log((np.sum(kernels, axis=1) + 1) / (len(centres) + 1)), axis=1)
+
+    def _propose(self, nPoints) -> np.ndarray:
+        """ Returns up to nPoints distinct, not yet observed points with the largest density ratio,
+        topped up with random points when the candidates run out."""
+
+        observed = self._scale(self.observedPosition)
+        order = np.argsort(self.observedFitness, kind="stable")
+        nGood = max(1, math.ceil(self._gamma * len(order)))
+        good, bad = observed[order[:nGood]], observed[order[nGood:]]
+        if len(bad) == 0:
+            bad = observed
+
+        # candidates are drawn around randomly chosen good points
+        centres = good[self._rng.integers(nGood, size=self._candidates)]
+        candidates = np.clip(centres + self._rng.normal(0, 1, centres.shape) * self._bandwidth(good), 0, 1)
+        scores = self._logDensity(candidates, good) - self._logDensity(candidates, bad)
+
+        candidates = self.searchSpace.clip(
+            self.searchSpace.lower + candidates * (self.searchSpace.upper - self.searchSpace.lower))
+        seen = {tuple(position) for position in self.observedPosition.tolist()}
+
+        proposals = []
+        for index in np.argsort(-scores, kind="stable"):
+            position = tuple(candidates[index].tolist())
+            if position not in seen:
+                seen.add(position)
+                proposals.append(candidates[index])
+            if len(proposals) == nPoints:
+                return np.array(proposals)
+
+        missing = self.searchSpace.sample(self._rng, nPoints - len(proposals))
+
+        return np.concatenate((np.reshape(proposals, (-1, len(self.searchSpace))), missing))
+
+    def _search(self, xTrain, yTrain):
+
+        start = time.perf_counter()
+        stalled = 0
+        # proposals are evaluated as many at a time as there are workers
+        batch, _ = allocateCores(self._coreBudget, self.swarmSize)
+
+        print("Sampling", self._startupPoints, "random points...")
+        positions = self.searchSpace.sample(self._rng, self._startupPoints)
+
+        while self.stopReason is None:
+            fitness = self._evaluatePositions(xTrain, yTrain, positions)
+            stalled = 0 if self._observe(positions, fitness) else stalled + len(positions)
+
+            self.stopReason = self._stopReason(stalled, start)
+            positions = self._propose(batch)
+
+
+class SuccessiveHalving(SearchBackend):
+
+    """ Successive halving: a generation of random points is evaluated at a low fidelity and only the best 1/eta of them
+    move on to the next, more expensive, rung until the survivors are evaluated at full fidelity.
+    Every generation of the stopping criteria is one rung, the last rung being full fidelity."""
+
+    name = "halving"
+
+    # factor by which every rung cuts the candidates and raises the cost of an evaluation
+    _eta = int(3)
+
+    def _search(self, xTrain, yTrain):
+
+        start = time.perf_counter()
+        rungs = self._stopping.maxGenerations
+        positions = np.unique(self.searchSpace.sample(self._rng, self.swarmSize), axis=0)
+
+        for rung in range(rungs):
+            # full fidelity on the last rung, which shares the fitness cache keys of full evaluations
+            fidelity = Fidelity.level(rungs - 1 - rung, self._eta)
+            print("Successive Halving: rung", rung + 1, "of", rungs, "with", len(positions), "candidates at", fidelity)
+
+            fitness = self._evaluatePositions(xTrain, yTrain, positions, fidelity=fidelity)
+            order = np.argsort(fitness, kind="stable")
+
+            # the best point of the latest rung is the result, earlier rungs are cheaper approximations
+            self._bestFitness = np.inf
+            self._observe(positions[order[:1]], fitness[order[:1]])
+
+            if rung == rungs - 1:
+                self.stopReason = "all {} rungs evaluated".format(rungs)
+                break
+
+            self.stopReason = self._stopping.reason(
+                0, 0, math.inf, self.evaluations, time.perf_counter() - start)
+            if self.stopReason is not None:
+                break
+
+            positions = positions[order[:max(1, math.ceil(len(positions) / self._eta))]]
+
+
+optimiserBackends = {}
+
+
+def registerOptimiser(optimiser) -> type:
+    """ Adds the optimiser class to the registry under its name and returns it."""
+
+    optimiserBackends[optimiser.name] = optimiser
+
+    return optimiser
+
+
+def checkOptions(name, options) -> type:
+    """ Returns the registered optimiser class with the given name once every option is known to be supported by it,
+    e.g. the initialisation scheme (number), multi-fidelity screening, checkpoints and the asynchronous mode of the swarm."""
+
+    try:
+        optimiser = optimiserBackends[name]
+    except KeyError:
+        raise ValueError("Unknown optimiser '{}', choose one of: {}.".format(
+            name, ", ".join(sorted(optimiserBackends)))) from None
+
+    supported = set(inspect.signature(optimiser.__init__).parameters) - {"self", "forest"}
+    unsupported = sorted(set(options) - supported)
+    if unsupported:
+        raise ValueError("The '{}' optimiser does not support: {}. Its options are: {}.".format(
+            name, ", ".join(unsupported), ", ".join(sorted(supported))))
+
+    return optimiser
+
+
+def createOptimiser(name, forest, **options) -> Optimiser:
+    """ Returns a new optimiser of the registered class with the given name, a ValueError is raised for any option
+    the optimiser does not support."""
+
+    return checkOptions(name, options)(forest=forest, **options)
+
+
+for _optimiser in (Heuristic, RandomSearch, TreeParzenSearch, SuccessiveHalving):
+    registerOptimiser(_optimiser)
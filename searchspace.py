@@ -0,0 +1,123 @@
+""" This module contains the search space of the hyperparameter optimisers: bounded integer and continuous dimensions."""
+
+from __future__ import annotations
+import itertools
+import math
+import numpy as np
+
+
+class Dimension:
+
+    """ One hyperparameter of the search space with inclusive bounds.
+    Integer dimensions are rounded to whole numbers, continuous dimensions are only clipped to their bounds."""
+
+    def __init__(self, name, lower, upper, integer=True):
+
+        if upper < lower:
+            raise ValueError("The upper bound of '{}' is below its lower bound.".format(name))
+
+        self.name = name
+        self.lower = lower
+        self.upper = upper
+        self.integer = integer
+
+    @property
+    def size(self):
+        """ Returns the number of distinct values of an integer dimension, infinite for a continuous one."""
+
+        return int(self.upper - self.lower + 1) if self.integer else math.inf
+
+    def __repr__(self):
+        return "Dimension({!r}, {!r}, {!r}, integer={!r})".format(self.name, self.lower, self.upper, self.integer)
+
+
+class SearchSpace:
+
+    """ Mixed integer and continuous search space of the particle swarm.
+
+    Positions are rows of a (particles x dimensions) array. The space clips and rounds positions, limits
+    velocities to a fraction of the range of each dimension and converts positions into hyperparameters.
+    The amount of features (max_features) is always the first dimension."""
+
+    # largest step a particle may take in one generation, as a share of the range of each dimension
+    _velocityFraction = 0.5
+
+    def __init__(self, dimensions):
+
+        if not dimensions or dimensions[0].name != "max_features":
+            raise ValueError("The first dimension of the search space must be 'max_features'.")
+
+        self.dimensions = list(dimensions)
+        self.names = [dimension.name for dimension in self.dimensions]
+        self.lower = np.array([dimension.lower for dimension in self.dimensions], dtype=float)
+        self.upper = np.array([dimension.upper for dimension in self.dimensions], dtype=float)
+        self.integer = np.array([dimension.integer for dimension in self.dimensions])
+        self.velocityLimit = self._velocityFraction * (self.upper - self.lower)
+
+    @classmethod
+    def featureSpace(cls, nFeatures) -> SearchSpace:
+        """ Returns the original one dimensional space over the amount of features."""
+
+        return cls([Dimension("max_features", 1, nFeatures)])
+
+    @classmethod
+    def forestSpace(cls, nFeatures) -> SearchSpace:
+        """ Returns the space over the amount of features and the forest hyperparameters which limit tree growth."""
+
+        return cls([Dimension("max_features", 1, nFeatures),
+                    Dimension("max_depth", 2, 32),
+                    Dimension("min_samples_leaf", 1, 20),
+                    Dimension("n_estimators", 25, 300),
+                    Dimension("max_samples", 0.3, 1.0, integer=False)])
+
+    def __len__(self):
+        return len(self.dimensions)
+
+    def __repr__(self):
+        return "SearchSpace({!r})".format(self.dimensions)
+
+    @property
+    def size(self):
+        """ Returns the number of distinct points of the space, infinite when a dimension is continuous."""
+
+        return math.prod(dimension.size for dimension in self.dimensions)
+
+    def sample(self, rng, nParticles) -> np.ndarray:
+        """ Returns uniformly drawn positions, one row per particle."""
+
+        positions = rng.uniform(self.lower, self.upper + self.integer, (nParticles, len(self)))
+
+        return self.clip(np.floor(positions) * self.integer + positions * ~self.integer)
+
+    def clip(self, positions) -> np.ndarray:
+        """ Returns the positions clipped to the bounds, with integer dimensions rounded to whole numbers."""
+
+        positions = np.where(self.integer, np.round(positions), positions)
+
+        return np.clip(positions, self.lower, self.upper)
+
+    def clipVelocity(self, velocities) -> np.ndarray:
+        return np.clip(velocities, -self.velocityLimit, self.velocityLimit)
+
+    def grid(self) -> np.ndarray:
+        """ Returns every point of a space of integer dimensions, in lexicographic order."""
+
+        if not self.integer.all():
+            raise ValueError("A space with continuous dimensions cannot be enumerated.")
+
+        return np.array(list(itertools.product(*(range(int(dimension.lower), int(dimension.upper) + 1)
+                                                 for dimension in self.dimensions))), dtype=float)
+
+    def toParams(self, position) -> dict:
+        """ Returns the hyperparameters of a position, integers for integer dimensions."""
+
+        return {name: int(value) if integer else float(value)
+                for name, value, integer in zip(self.names, self.clip(np.asarray(position, dtype=float)), self.integer)}
+
+    def toResult(self, position):
+        """ Returns the result of the optimisers for a position, the amount of features alone in a one dimensional
+        space and the dictionary of hyperparameters otherwise."""
+
+        params = self.toParams(position)
+
+        return params["max_features"] if len(self) == 1 else params
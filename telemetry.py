@@ -0,0 +1,63 @@
+""" This module is responsible for recording structured telemetry of the optimisers as JSON lines."""
+
+from __future__ import annotations
+from abc import ABC, abstractmethod
+import json
+import math
+import os
+import time
+import numpy as np
+
+
+def _plain(value):
+    """ Returns the value with numpy scalars and arrays converted to python values and non-finite floats to None,
+    so that every record is strict JSON."""
+
+    if isinstance(value, dict):
+        return {str(key): _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_plain(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+
+    return value
+
+
+class Telemetry(ABC):
+    """ Interface for the sinks of optimisation telemetry."""
+
+    @abstractmethod
+    def record(self, event, **fields) -> None:
+        pass
+
+
+class JsonLinesTelemetry(Telemetry):
+
+    """ Appends one JSON object per event to a file, so several runs and processes can share it.
+    Every record carries its event name and the wall-clock time it was written at."""
+
+    def __init__(self, path):
+        self._path = path
+
+    def record(self, event, **fields):
+
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        entry = _plain(dict(event=event, time=time.time(), **fields))
+
+        # a single write of a whole line keeps concurrent appends intact
+        with open(self._path, "a") as telemetry:
+            telemetry.write(json.dumps(entry, allow_nan=False) + "\n")
+
+    @staticmethod
+    def read(path, run=None) -> list:
+        """ Returns the records of the file, only those of one run when its id is given."""
+
+        with open(path) as telemetry:
+            records = [json.loads(line) for line in telemetry if line.strip()]
+
+        return [entry for entry in records if run is None or entry.get("run") == run]